@@ -3,6 +3,7 @@ import sys
 import pandas as pd
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
+from deployment_scripts.csv_reader import read_sheet
 
 
 # Change the crendentials in the configuration.env file
@@ -17,7 +18,7 @@ def load_env(file_path):
         }
 
 def loading_engine(config):
-    return(create_engine(f"postgresql+psycopg2://{config['USER']}:{config['PASSWORD']}@{config['HOST']}:{config['PORT']}/{config['DB_NAME']}"))
+    return(create_engine(f"postgresql+psycopg://{config['USER']}:{config['PASSWORD']}@{config['HOST']}:{config['PORT']}/{config['DB_NAME']}"))
 
 def import_csv_to_db(folder_path, engine):
     files = os.listdir(folder_path)
@@ -25,7 +26,7 @@ def import_csv_to_db(folder_path, engine):
         if file.endswith(".csv"):
             file_path = os.path.join(folder_path, file)
             table_name = file.rsplit(".", 1)[0].replace(" ", "_").lower()
-            df = pd.read_csv(file_path , encoding="ISO-8859-1", sep=None, engine='python')
+            df = read_sheet(file_path)
             df.to_sql(table_name, engine, schema ='raw', if_exists="fail", index=False)
             print(f"Table '{table_name}' created Successfully.")
 
@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from deployment_scripts.csv_reader import read_sheet
+
+SIZES = [10_000, 200_000]
+
+
+# Synthetic sheets shaped like the real exports (column names and value styles)
+def make_quiz(rows, rng):
+    return pd.DataFrame({
+        "user_id": [f"{n:06d}" for n in rng.integers(1, 50_000, rows)],
+        "data_fields": [f"Quiz {n} - Question {q}" for n, q in zip(rng.integers(1, 40, rows), rng.integers(1, 15, rows))],
+        "value": rng.integers(0, 10, rows),
+    })
+
+
+def make_session(rows, rng):
+    secs = rng.integers(0, 7200, rows).astype(float)
+    secs[rng.random(rows) < 0.05] = np.nan
+    watched = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 600, rows), unit="D")
+    return pd.DataFrame({
+        "Email": [f"student{n}@example.com" for n in rng.integers(1, 50_000, rows)],
+        "Session_Code": [f"SUK{n:03d}" for n in rng.integers(1, 300, rows)],
+        "Duration_in_hrs": np.round(secs / 3600, 2),
+        "Duration_in_secs": secs,
+        "watched_on": watched.strftime("%Y-%m-%d"),
+    })
+
+
+def make_assignment(rows, rng):
+    submitted = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10_000_000, rows), unit="s")
+    return pd.DataFrame({
+        "assignment_id": rng.integers(1, 500, rows).astype(str),
+        "assignment_name": [f"Assignment {n}: Problem statement" for n in rng.integers(1, 40, rows)],
+        "Email": [f"student{n}@example.com" for n in rng.integers(1, 50_000, rows)],
+        "student_name": [f"Student {n}" for n in rng.integers(1, 50_000, rows)],
+        "submission_status": np.array(["submitted", "graded", "late"])[rng.integers(0, 3, rows)],
+        # Graphy feedback often spans lines; the field is quoted with the newline inside
+        "feedback_comments": np.array(["Good work, well structured.", "", "Please add references",
+                                       "Good start.\nAdd a conclusion,\nthen resubmit."])[rng.integers(0, 4, rows)],
+        "submitted_at": submitted.strftime("%Y-%m-%d %H:%M:%S"),
+        "assignment_file": [f"https://files.example.com/{n}.pdf" for n in rng.integers(1, 10**6, rows)],
+    })
+
+
+def make_registration(rows, rng):
+    return pd.DataFrame({
+        "Timestamp": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10**7, rows), unit="s")).strftime("%m/%d/%Y %H:%M:%S"),
+        "Email Address": [f"student{n}@example.com" for n in rng.integers(1, 50_000, rows)],
+        "Full Name": [f"Student {n}" for n in rng.integers(1, 50_000, rows)],
+        "Phone": [f"9{n:09d}" for n in rng.integers(0, 10**9, rows)],
+        "College": [f"Government College, District {n}" for n in rng.integers(1, 700, rows)],
+        "State": np.array(["Telangana", "Maharashtra", "Karnataka", "Bihar"])[rng.integers(0, 4, rows)],
+        "Year of Study": rng.integers(1, 5, rows),
+    })
+
+
+SHEETS = {
+    "quiz": make_quiz,
+    "session": make_session,
+    "assignment": make_assignment,
+    "registration": make_registration,
+}
+
+
+# Readers as the scripts called them before csv_reader
+def legacy_sniffing_reader(path):
+    """import_csv_to_db / load_csvs_to_db: python engine with delimiter sniffing."""
+    return pd.read_csv(path, encoding="ISO-8859-1", sep=None, engine="python")
+
+
+def legacy_default_reader(path):
+    """upsert_live_session_data / insert_new_data: pandas defaults."""
+    return pd.read_csv(path, encoding="ISO-8859-1")
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    rng = np.random.default_rng(0)
+    print(f"{'sheet':<13} {'rows':>8} {'python+sniff (s)':>17} {'pandas default (s)':>19} {'read_sheet (s)':>15} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as folder:
+        for sheet_type, make in SHEETS.items():
+            for rows in sizes:
+                path = os.path.join(folder, f"{sheet_type}_{rows}.csv")
+                make(rows, rng).to_csv(path, index=False)
+
+                sniff_time, legacy = timed(lambda: legacy_sniffing_reader(path))
+                default_time, _ = timed(lambda: legacy_default_reader(path))
+                new_time, new = timed(lambda: read_sheet(path, sheet_type))
+
+                # Same rows and columns before the timing means anything
+                assert new.shape == legacy.shape, f"{sheet_type}: shape {new.shape} != {legacy.shape}"
+                assert list(new.columns) == list(legacy.columns), f"{sheet_type}: column mismatch"
+                if "feedback_comments" in new.columns:
+                    assert new["feedback_comments"].fillna("").astype(str).tolist() == \
+                        legacy["feedback_comments"].fillna("").astype(str).tolist(), f"{sheet_type}: multi-line text mismatch"
+
+                print(f"{sheet_type:<13} {rows:>8} {sniff_time:>17.3f} {default_time:>19.3f} "
+                      f"{new_time:>15.3f} {sniff_time / new_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
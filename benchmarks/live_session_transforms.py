@@ -0,0 +1,68 @@
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from deployment_scripts.upsert_live_session_data import convert_batch, convert_date
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+# Per-cell implementations the loader used before vectorization (reference only)
+def legacy_convert_batch(batch_value):
+    if not batch_value:
+        return None
+    parts = batch_value.split()
+    if len(parts) != 2:
+        return None
+    program, number = parts[0], parts[1]
+    if program.lower() == "incubator":
+        code_prefix = "INC"
+    elif program.lower() == "accelerator":
+        code_prefix = "ACC"
+    else:
+        code_prefix = program[:3].upper()
+    code_number = str(number).replace(".0", "").zfill(3)
+    return f"{code_prefix}{code_number}"
+
+
+def legacy_convert_date(date_value):
+    try:
+        return datetime.strptime(date_value, "%d-%b-%y").strftime("%Y-%m-%d")
+    except Exception:
+        return None
+
+
+def make_sheet(rows, seed=0):
+    """Session-sheet shaped frame: Batch like 'Incubator 7.0', Date like '05-Jan-24'."""
+    rng = np.random.default_rng(seed)
+    programs = np.array(["Incubator", "Accelerator", "Kalpana"])
+    batch = [f"{p} {n}.0" for p, n in zip(programs[rng.integers(0, 3, rows)], rng.integers(1, 15, rows))]
+    dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D")
+    return pd.DataFrame({"Batch": batch, "Date": dates.strftime("%d-%b-%y")})
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for rows in sizes:
+        df = make_sheet(rows)
+        legacy_time, legacy = timed(lambda: (df["Batch"].apply(legacy_convert_batch), df["Date"].apply(legacy_convert_date)))
+        new_time, new = timed(lambda: (convert_batch(df["Batch"]), convert_date(df["Date"])))
+
+        # Both implementations must agree before the timing means anything
+        assert legacy[0].tolist() == new[0].tolist()
+        assert legacy[1].tolist() == new[1].tolist()
+
+        print(f"{rows:>10,} {legacy_time:>12.3f} {new_time:>15.3f} {legacy_time / new_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or SIZES)
@@ -0,0 +1,127 @@
+import io
+
+import pandas as pd
+from sqlalchemy import text
+
+# Rows rendered to CSV per COPY write; bounds the size of the in-memory buffer
+COPY_BATCH_ROWS = 50000
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _prepare_for_copy(df):
+    """Render whole-number float columns (ints with NaN) as integers, not '1.0'."""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]):
+            values = df[col].dropna()
+            if (values == values.round()).all():
+                df[col] = df[col].astype("Int64")
+    return df
+
+
+def copy_dataframe(conn, table, df, batch_rows=COPY_BATCH_ROWS):
+    """Stream a DataFrame into `table` with COPY ... FROM STDIN; returns rows copied.
+
+    Runs on the DBAPI connection behind the SQLAlchemy `conn`, inside its
+    current transaction. Missing values are written as NULL.
+    """
+    columns = ", ".join(_quote(col) for col in df.columns)
+    cur = conn.connection.driver_connection.cursor()
+    with cur.copy(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)") as copy:
+        for start in range(0, len(df), batch_rows):
+            buffer = io.StringIO()
+            _prepare_for_copy(df.iloc[start:start + batch_rows]).to_csv(buffer, index=False, header=False)
+            copy.write(buffer.getvalue())
+    cur.close()
+    return len(df)
+
+
+def create_staging_table(conn, target, columns):
+    """Create an empty temp table with `target`'s types for `columns` only, dropped at commit.
+
+    No defaults or NOT NULL constraints are copied, so staging never draws
+    values from the target's sequences.
+    """
+    staging = "stg_" + target.split(".")[-1].strip('"')
+    col_list = ", ".join(_quote(col) for col in columns)
+    conn.execute(text(f"DROP TABLE IF EXISTS pg_temp.{_quote(staging)}"))
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {_quote(staging)} ON COMMIT DROP AS
+        SELECT {col_list} FROM {target} WITH NO DATA
+    """))
+    return _quote(staging)
+
+
+def distinct_guard(columns, alias="t"):
+    """ON CONFLICT ... DO UPDATE condition that skips rows whose `columns` are unchanged.
+
+    `columns` must already be quoted where needed.
+    """
+    current = ", ".join(f"{alias}.{col}" for col in columns)
+    incoming = ", ".join(f"EXCLUDED.{col}" for col in columns)
+    return f"({current}) IS DISTINCT FROM ({incoming})"
+
+
+def run_counted_upsert(conn, query, params=None):
+    """Execute an upsert written as `candidates` / `upserted` CTEs.
+
+    The statement must return one row with candidates, inserted and updated
+    counts (see the old -> raw queries). Returns (inserted, updated,
+    unchanged), where unchanged rows matched an existing key but no column
+    differed, so they were not rewritten.
+    """
+    row = conn.execute(query, params or {}).one()
+    return row.inserted, row.updated, row.candidates - row.inserted - row.updated
+
+
+def upsert_from_staging(conn, staging, target, columns, conflict_columns, stamp_column=None):
+    """Move staged rows into `target` with one INSERT ... ON CONFLICT.
+
+    Later rows win when the file repeats a key. Existing rows are only
+    rewritten when a column actually changes. `stamp_column`, if given, is
+    set to now() on every inserted or updated row. Returns (inserted, updated).
+    """
+    col_list = ", ".join(_quote(col) for col in columns)
+    key_list = ", ".join(_quote(col) for col in conflict_columns)
+    insert_list, select_list = col_list, col_list
+    update_cols = [_quote(col) for col in columns if col not in conflict_columns]
+    assignments = [f"{col} = EXCLUDED.{col}" for col in update_cols]
+    if stamp_column:
+        insert_list += f", {_quote(stamp_column)}"
+        select_list += ", now()"
+        assignments.append(f"{_quote(stamp_column)} = now()")
+    if update_cols:
+        action = "DO UPDATE SET " + ", ".join(assignments) + " WHERE " + distinct_guard(update_cols)
+    else:
+        action = "DO NOTHING"
+
+    result = conn.execute(text(f"""
+        WITH upserted AS (
+            INSERT INTO {target} AS t ({insert_list})
+            SELECT DISTINCT ON ({key_list}) {select_list}
+            FROM {staging}
+            ORDER BY {key_list}, ctid DESC
+            ON CONFLICT ({key_list}) {action}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE inserted) AS inserted,
+            COUNT(*) FILTER (WHERE NOT inserted) AS updated
+        FROM upserted
+    """)).one()
+    return result.inserted, result.updated
+
+
+def stage_and_upsert(conn, target, df, conflict_columns, stamp_column=None):
+    """COPY `df` into a staging copy of `target`, then upsert it in one statement.
+
+    Returns (staged, inserted, updated).
+    """
+    staging = create_staging_table(conn, target, df.columns)
+    staged = copy_dataframe(conn, staging, df)
+    inserted, updated = upsert_from_staging(conn, staging, target, list(df.columns), conflict_columns,
+                                            stamp_column)
+    return staged, inserted, updated
@@ -0,0 +1,90 @@
+import threading
+
+from sqlalchemy import bindparam, text
+
+# One query per kind for every requested table of a schema, instead of an
+# Inspector round-trip per table and per call.
+COLUMNS_QUERY = text("""
+    SELECT c.relname AS table_name, a.attname AS name, format_type(a.atttypid, a.atttypmod) AS type
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = :schema AND c.relname IN :tables
+      AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY c.relname, a.attnum
+""").bindparams(bindparam("tables", expanding=True))
+
+CONSTRAINTS_QUERY = text("""
+    SELECT c.relname AS table_name, con.conname AS name, con.contype AS type
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = :schema AND c.relname IN :tables
+""").bindparams(bindparam("tables", expanding=True))
+
+INDEXES_QUERY = text("""
+    SELECT tablename AS table_name, indexname AS name, indexdef AS definition
+    FROM pg_indexes
+    WHERE schemaname = :schema AND tablename IN :tables
+""").bindparams(bindparam("tables", expanding=True))
+
+
+class CatalogCache:
+    """Columns, constraints and indexes per table, read once per run.
+
+    Tables are fetched on first use (or up front with `prefetch`). Call
+    `invalidate` after running DDL against a table so the next lookup
+    re-reads it. Safe to share between loader threads.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, schema, tables):
+        """Load every table in `tables` that is not cached yet, three queries in total."""
+        with self._lock:
+            missing = sorted({t for t in tables if (schema, t) not in self._tables})
+            if not missing:
+                return
+            entries = {t: {"columns": {}, "constraints": {}, "indexes": {}} for t in missing}
+            params = {"schema": schema, "tables": missing}
+            with self.engine.connect() as conn:
+                for row in conn.execute(COLUMNS_QUERY, params):
+                    entries[row.table_name]["columns"][row.name] = row.type
+                for row in conn.execute(CONSTRAINTS_QUERY, params):
+                    entries[row.table_name]["constraints"][row.name] = row.type
+                for row in conn.execute(INDEXES_QUERY, params):
+                    entries[row.table_name]["indexes"][row.name] = row.definition
+            for table, entry in entries.items():
+                self._tables[(schema, table)] = entry
+
+    def _entry(self, schema, table):
+        if (schema, table) not in self._tables:
+            self.prefetch(schema, [table])
+        return self._tables[(schema, table)]
+
+    def columns(self, schema, table):
+        """Column name -> SQL type, in table order (empty if the table does not exist)."""
+        return self._entry(schema, table)["columns"]
+
+    def constraints(self, schema, table):
+        """Constraint name -> pg_constraint.contype ('p', 'u', 'f', 'c', ...)."""
+        return self._entry(schema, table)["constraints"]
+
+    def unique_constraints(self, schema, table):
+        return {name for name, kind in self.constraints(schema, table).items() if kind == "u"}
+
+    def indexes(self, schema, table):
+        """Index name -> CREATE INDEX definition."""
+        return self._entry(schema, table)["indexes"]
+
+    def exists(self, schema, table):
+        return bool(self.columns(schema, table))
+
+    def invalidate(self, schema, table=None):
+        """Forget one table, or every cached table of `schema`."""
+        with self._lock:
+            for key in [k for k in self._tables if k[0] == schema and (table is None or k[1] == table)]:
+                del self._tables[key]
@@ -1,35 +1,283 @@
-
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, event, MetaData, text
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.pool import QueuePool
+from dotenv import dotenv_values
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
 import os
+import sys
+import threading
+import time
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+# Config files: config.env by default, config.<env>.env for a named environment
+# (e.g. config.prod.env, config.staging.env, config.local.env).
+ENV_VARIABLE = "DEPLOY_ENV"
+
+
+def env_from_argv(argv):
+    """Return the name given with `--env <name>` / `--env=<name>` in argv, or None."""
+    for i, arg in enumerate(argv[1:], start=1):
+        if arg == "--env" and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith("--env="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+def add_env_argument(parser):
+    """Add the --env option to a script's argparse parser (read by get_config)."""
+    parser.add_argument("--env", help="Config environment: reads config.<env>.env instead of config.env")
+    return parser
+
+
+_selected_env = None
+
+
+def set_env(name):
+    """Select the config environment before the first database access."""
+    global _selected_env
+    if get_config.cache_info().currsize:
+        raise RuntimeError("Configuration already loaded; call set_env() before get_engine().")
+    _selected_env = name
+
+
+def _config_file(env):
+    filename = f"config.{env}.env" if env else "config.env"
+    # Package directory first, then the working directory for older setups
+    for folder in (PACKAGE_DIR, Path.cwd()):
+        path = folder / filename
+        if path.is_file():
+            return path
+    if env:
+        raise FileNotFoundError(f"Config file '{filename}' not found in {PACKAGE_DIR} or {Path.cwd()}")
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_config():
+    """Resolve DB settings once; environment variables override the config file."""
+    env = _selected_env or env_from_argv(sys.argv) or os.getenv(ENV_VARIABLE)
+    path = _config_file(env)
+    values = dotenv_values(path) if path else {}
+
+    def setting(name, default=None):
+        return os.getenv(name) or values.get(name) or default
+
+    return {
+        "env": env or "default",
+        "path": str(path) if path else None,
+        "DB_USER": setting("DB_USER"),
+        "DB_PASSWORD": setting("DB_PASSWORD"),
+        "DB_HOST": setting("DB_HOST", "localhost"),
+        "DB_PORT": setting("DB_PORT", "5432"),
+        "DB_NAME": setting("DB_NAME"),
+    }
+
+
+def get_database_url():
+    """Return the SQLAlchemy URL for the selected environment."""
+    config = get_config()
+    return (
+        f"postgresql+psycopg://{config['DB_USER']}:{config['DB_PASSWORD']}"
+        f"@{config['DB_HOST']}:{config['DB_PORT']}/{config['DB_NAME']}"
+    )
+
+
+# Engine profiles
+#   pool_size / max_overflow  -> SQLAlchemy QueuePool sizing
+#   statement_timeout / lock_timeout -> server-side limits (0 = no limit)
+#   session_settings -> extra GUCs applied on every new connection
+ENGINE_PROFILES = {
+    "default": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "statement_timeout": "0",
+        "lock_timeout": "0",
+        "session_settings": {},
+    },
+    # Long upserts and CSV loads: more memory for sorts/hashes, async commit
+    "bulk_load": {
+        "pool_size": 4,
+        "max_overflow": 4,
+        "statement_timeout": "0",
+        "lock_timeout": "60s",
+        "session_settings": {
+            "work_mem": "256MB",
+            "maintenance_work_mem": "512MB",
+            "synchronous_commit": "off",
+        },
+    },
+    # Read-heavy queries feeding exports and dashboards
+    "reporting": {
+        "pool_size": 2,
+        "max_overflow": 2,
+        "statement_timeout": "10min",
+        "lock_timeout": "30s",
+        "session_settings": {
+            "work_mem": "64MB",
+            "default_transaction_read_only": "on",
+        },
+    },
+    # Schema changes: fail fast instead of queueing behind long locks
+    "ddl": {
+        "pool_size": 1,
+        "max_overflow": 0,
+        "statement_timeout": "5min",
+        "lock_timeout": "5s",
+        "session_settings": {},
+    },
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class PoolStats:
+    """Checkout wait times and connection counts for one engine."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.checkouts = 0
+        self.connects = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
 
-# Load environment variables from config.env
-load_dotenv(r"config.env")
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
 
-# Fetch DB credentials
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME")
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
 
-# Database connection URL
-DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    def summary(self, pool):
+        avg_wait = self.total_wait / self.checkouts if self.checkouts else 0.0
+        return (
+            f"[{self.profile}] checkouts={self.checkouts} connects={self.connects} "
+            f"in_use={pool.checkedout()} idle={pool.checkedin()} overflow={pool.overflow()} "
+            f"wait_avg={avg_wait * 1000:.1f}ms wait_max={self.max_wait * 1000:.1f}ms"
+        )
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
 
-# Create a configured "Session" class
-SessionLocal = sessionmaker(bind=engine)
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    stats = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - start)
+
+
+def _connect_args(profile, settings):
+    options = [
+        f"-c statement_timeout={settings['statement_timeout']}",
+        f"-c lock_timeout={settings['lock_timeout']}",
+    ]
+    options += [f"-c {name}={value}" for name, value in settings["session_settings"].items()]
+    return {
+        "application_name": f"deployment_scripts:{profile}",
+        "options": " ".join(options),
+    }
+
+
+def _create_engine(profile):
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown engine profile '{profile}'. Choose from: {', '.join(ENGINE_PROFILES)}")
+    settings = ENGINE_PROFILES[profile]
+
+    new_engine = create_engine(
+        get_database_url(),
+        poolclass=TimedQueuePool,
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_pre_ping=True,
+        connect_args=_connect_args(profile, settings),
+    )
+
+    stats = PoolStats(profile)
+    new_engine.pool.stats = stats
+    event.listen(new_engine, "connect", lambda dbapi_conn, record: stats.record_connect())
+    return new_engine
+
 
 # Create metadata object
 metadata = MetaData()
 
-def get_engine():
-    """Return SQLAlchemy engine."""
-    return engine
+
+def get_engine(profile="default"):
+    """Return the SQLAlchemy engine for a profile (built once, then reused)."""
+    with _engines_lock:
+        if profile not in _engines:
+            _engines[profile] = _create_engine(profile)
+        return _engines[profile]
+
+
+def lift_statement_timeout(conn):
+    """Disable statement_timeout for the rest of the current transaction.
+
+    For migrations that rewrite whole tables on the ddl profile, whose
+    5 minute limit would cancel them partway. lock_timeout still applies.
+    """
+    conn.execute(text("SET LOCAL statement_timeout = 0"))
+
+
+def clamp_workers(workers, profile="default", reserved=0):
+    """Limit a worker count to the connections a profile's pool can hand out.
+
+    Each worker holds one connection; `reserved` more are kept free for the
+    coordinating thread. Workers above the limit would otherwise wait for
+    `pool_timeout` and fail.
+    """
+    settings = ENGINE_PROFILES[profile]
+    limit = max(settings["pool_size"] + settings["max_overflow"] - reserved, 1)
+    if workers > limit:
+        print(f"** {workers} workers exceed the '{profile}' pool; using {limit}")
+        return limit
+    return max(workers, 1)
+
+
+def pool_status(profile="default"):
+    """Return a one-line summary of checkout wait time and connection counts."""
+    pool = get_engine(profile).pool
+    return pool.stats.summary(pool)
+
+
+@contextmanager
+def pipeline_cursor(conn):
+    """Yield a psycopg 3 cursor in pipeline mode on a SQLAlchemy connection.
+
+    Statements run inside the connection's current transaction; queued
+    results are synced (and errors raised) when the block exits.
+    """
+    pg_conn = conn.connection.driver_connection
+    with pg_conn.pipeline():
+        with pg_conn.cursor() as cur:
+            yield cur
+
+
+def execute_pipelined(cur, query, rows):
+    """Send `query` once per parameter set as a server-side prepared statement."""
+    count = 0
+    for params in rows:
+        cur.execute(query, params, prepare=True)
+        count += 1
+    return count
+
+
+# Create a configured "Session" class (bound to an engine on first use)
+SessionLocal = sessionmaker()
 
 def get_session():
     """Return a new database session."""
-    return SessionLocal()
+    return SessionLocal(bind=get_engine())
@@ -0,0 +1,337 @@
+import codecs
+import csv
+import io
+import os
+from collections import namedtuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # Fall back to pandas' C parser
+    pa = None
+
+SNIFF_BYTES = 64 * 1024
+FALLBACK_ENCODING = "ISO-8859-1"
+DELIMITERS = ",;\t|"
+
+# Explicit dtypes per known sheet type, keyed by normalized header name.
+# Keys and free text stay as strings; numeric columns not listed are inferred.
+SHEET_DTYPES = {
+    "live_session": {
+        "Batch": str,
+        "Date": str,
+        "Session Code": str,
+        "Session Type": str,
+        "Topic": str,
+    },
+    # Registration exports are appended as text; COPY casts to column types
+    "registration": str,
+    "quiz": {
+        "user_id": str,
+        "data_fields": str,
+    },
+    "session": {
+        "Email": str,
+        "Session_Code": str,
+        "watched_on": str,
+    },
+    "assignment": {
+        "assignment_id": str,
+        "assignment_name": str,
+        "Email": str,
+        "student_name": str,
+        "submission_status": str,
+        "feedback_comments": str,
+        "submitted_at": str,
+        "assignment_file": str,
+    },
+}
+
+# Columns that identify each monitoring export; a sheet matches when all are present.
+# Checked in order, so the first matching type wins.
+SHEET_SIGNATURES = {
+    "quiz": ["user_id", "data_fields", "value"],
+    "session": ["Email", "Session_Code", "Duration_in_hrs", "Duration_in_secs", "watched_on"],
+    "assignment": ["assignment_id", "submitted_at", "Email"],
+}
+
+# Typed columns of the monitoring sheets, applied by coerce_sheet() after parsing.
+# Types match the retyped old.* columns (see retype_old_monitoring_columns.py).
+SHEET_COLUMN_TYPES = {
+    "quiz": {"value": "int"},
+    "session": {"Duration_in_secs": "int", "Duration_in_hrs": "numeric", "watched_on": "date"},
+    "assignment": {"submitted_at": "timestamp"},
+}
+
+# format_type() name of the database column each type is stored in
+COLUMN_TYPE_NAMES = {"int": "integer", "numeric": "numeric", "date": "date", "timestamp": "timestamp without time zone"}
+
+# Session_Code prefix -> session_kind, derived at ingest (see session_kind()).
+# Add a prefix here for a new session type, then rerun add_session_kind_column.py
+# to classify rows already loaded and run old -> raw once with --full.
+# The longest matching prefix wins.
+SESSION_KIND_LIVE = "live"
+SESSION_KIND_PRE_RECORDED = "pre_recorded"
+SESSION_KIND_PREFIXES = {
+    "SUK": SESSION_KIND_LIVE,
+    "WS": SESSION_KIND_LIVE,
+    "MC": SESSION_KIND_LIVE,
+    "VID": SESSION_KIND_PRE_RECORDED,
+}
+
+CsvFormat = namedtuple("CsvFormat", ["encoding", "delimiter", "header"])
+
+
+def normalize_column(name):
+    return name.strip().replace("\ufeff", "")
+
+
+def _detect_encoding(sample):
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sample boundary is still UTF-8
+        if e.start >= len(sample) - 3 and e.reason == "unexpected end of data":
+            return "utf-8"
+        return FALLBACK_ENCODING
+
+
+def sniff_csv(path, sample_bytes=SNIFF_BYTES):
+    """Detect encoding, delimiter and header from the first few KB of a file."""
+    with open(path, "rb") as f:
+        sample = f.read(sample_bytes)
+    encoding = _detect_encoding(sample)
+    text = sample.decode(encoding, errors="ignore")
+
+    try:
+        delimiter = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+
+    first_line = next(csv.reader([text.split("\n", 1)[0].rstrip("\r")], delimiter=delimiter), [])
+    return CsvFormat(encoding, delimiter, first_line)
+
+
+def read_header(path):
+    """Return the normalized column names without parsing the file body."""
+    return [normalize_column(col) for col in sniff_csv(path).header]
+
+
+def detect_sheet_type(header):
+    """Return the SHEET_SIGNATURES type whose columns are all in `header`, or None."""
+    columns = {normalize_column(col) for col in header}
+    for sheet_type, required in SHEET_SIGNATURES.items():
+        if columns.issuperset(required):
+            return sheet_type
+    return None
+
+
+def _dtype_for(sheet_type, header):
+    dtypes = SHEET_DTYPES.get(sheet_type)
+    if dtypes is None:
+        return None
+    if dtypes is str:
+        return str
+    # Map normalized names back to the raw header spelling
+    raw_names = {normalize_column(col): col for col in header}
+    return {raw_names[col]: dtype for col, dtype in dtypes.items() if col in raw_names}
+
+
+def _finish(df):
+    df.columns = [normalize_column(col) for col in df.columns]
+    return df
+
+
+def _read_arrow(path, fmt, encoding, dtypes):
+    """Parse with pyarrow's multithreaded reader; None if the bytes are not `encoding`."""
+    header = [normalize_column(col) for col in fmt.header]
+    if dtypes is str:
+        column_types = {col: pa.string() for col in fmt.header}
+    else:
+        column_types = {col: pa.string() for col in (dtypes or {})}
+    try:
+        table = pa_csv.read_csv(
+            path,
+            read_options=pa_csv.ReadOptions(encoding=encoding),
+            # Quoted fields may span lines (e.g. Graphy feedback_comments)
+            parse_options=pa_csv.ParseOptions(delimiter=fmt.delimiter, newlines_in_values=True),
+            # Empty cells are missing values, as with pandas
+            convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+        )
+    except pa.ArrowInvalid as e:
+        if "UTF8" in str(e):
+            return None
+        raise
+    # Undecodable text columns come back as binary instead of failing
+    if any(pa.types.is_binary(field.type) for field in table.schema):
+        return None
+    df = table.to_pandas()
+    df.columns = header
+    return df
+
+
+def read_sheet(path, sheet_type=None, fmt=None):
+    """Parse a whole CSV with the sniffed delimiter/encoding and the sheet's dtypes.
+
+    Uses pyarrow when installed, pandas' C parser otherwise. Text that is not
+    valid in the sniffed encoding is re-read as ISO-8859-1.
+    """
+    fmt = fmt or sniff_csv(path)
+    dtypes = _dtype_for(sheet_type, fmt.header)
+
+    if pa is not None:
+        for encoding in dict.fromkeys([fmt.encoding, FALLBACK_ENCODING]):
+            df = _read_arrow(path, fmt, encoding, dtypes)
+            if df is not None:
+                return df
+        raise ValueError(f"Could not decode {path} as {fmt.encoding} or {FALLBACK_ENCODING}")
+
+    try:
+        return _finish(pd.read_csv(path, sep=fmt.delimiter, dtype=dtypes, encoding=fmt.encoding))
+    except UnicodeDecodeError:
+        return _finish(pd.read_csv(path, sep=fmt.delimiter, dtype=dtypes, encoding=FALLBACK_ENCODING))
+
+
+def _parse_block(data, fmt, dtype, **kwargs):
+    options = dict(sep=fmt.delimiter, dtype=dtype, engine="c", header=None, names=fmt.header,
+                   encoding=fmt.encoding)
+    options.update(kwargs)
+    return _finish(pd.read_csv(io.BytesIO(data), **options))
+
+
+def _decode_block(data, fmt, dtype, **kwargs):
+    """Parse one block strictly; returns (DataFrame, fmt) with the encoding that worked.
+
+    The encoding is sniffed from the start of the file only, so a block
+    further in may not decode. Its bytes are then read as ISO-8859-1, as
+    read_sheet does, and so are the blocks after it. Earlier blocks decoded
+    cleanly and are unaffected.
+    """
+    try:
+        return _parse_block(data, fmt, dtype, **kwargs), fmt
+    except UnicodeDecodeError:
+        if fmt.encoding == FALLBACK_ENCODING:
+            raise
+        fmt = fmt._replace(encoding=FALLBACK_ENCODING)
+        return _parse_block(data, fmt, dtype, **kwargs), fmt
+
+
+def iter_sheet_blocks(path, sheet_type=None, chunk_rows=20000, fmt=None, start_offset=0, **kwargs):
+    """Yield (DataFrame, end_offset, total_bytes) for blocks of at most `chunk_rows` records.
+
+    Records are split on raw bytes (a newline ends a record only outside
+    quotes), so `end_offset` is the exact byte position after the block's
+    last record. Passing it back as `start_offset` resumes right after that
+    block. Memory is bounded by the block size. Text is never replaced: from
+    the first block that is not valid in the sniffed encoding onward, blocks
+    are read as ISO-8859-1.
+    """
+    fmt = fmt or sniff_csv(path)
+    dtype = _dtype_for(sheet_type, fmt.header)
+    total_bytes = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+        if start_offset:
+            f.seek(start_offset)
+        else:
+            f.readline()  # Header (names come from the sniffed format)
+
+        lines = []
+        records = 0
+        open_quotes = False
+        for line in f:
+            lines.append(line)
+            # An odd number of quotes leaves a quoted field open across the newline
+            if line.count(b'"') % 2:
+                open_quotes = not open_quotes
+            if open_quotes:
+                continue
+            records += 1
+            if records == chunk_rows:
+                block, fmt = _decode_block(b"".join(lines), fmt, dtype, **kwargs)
+                yield block, f.tell(), total_bytes
+                lines, records = [], 0
+
+        if lines and b"".join(lines).strip():
+            block, fmt = _decode_block(b"".join(lines), fmt, dtype, **kwargs)
+            yield block, f.tell(), total_bytes
+
+
+def iter_sheet_chunks(path, sheet_type=None, chunk_rows=20000, fmt=None, **kwargs):
+    """Yield DataFrames of at most `chunk_rows` rows (see iter_sheet_blocks)."""
+    for chunk, _, _ in iter_sheet_blocks(path, sheet_type, chunk_rows, fmt, **kwargs):
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Typed coercion
+# ---------------------------------------------------------------------------
+
+def blank_to_na(values):
+    """Strip text values and turn blank, 'NaN' and 'NULL' cells into missing values."""
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    values = values.astype("string").str.strip()
+    return values.mask(values.isin(["", "NaN", "nan", "NULL", "null"]))
+
+
+def _to_int(values):
+    return pd.to_numeric(values, errors="coerce").round().astype("Int64")
+
+
+def _to_numeric(values):
+    return pd.to_numeric(values, errors="coerce").astype("float64")
+
+
+def _to_timestamp(values):
+    # ISO 8601 is parsed in one vectorized pass. Offsets are converted to UTC, so a
+    # column mixing them does not raise, and the result is stored without a time zone.
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601", utc=True)
+    leftover = values.notna() & parsed.isna()
+    if leftover.any():
+        # Fallback for other layouts: only the distinct values ISO 8601 missed are parsed one by one
+        uniques = values[leftover].unique()
+        fallback = pd.to_datetime(pd.Series(uniques), errors="coerce", format="mixed", utc=True)
+        # Mapped through a Series so the result stays tz-aware even when nothing parses
+        parsed[leftover] = values[leftover].map(pd.Series(fallback.array, index=uniques))
+    return parsed.dt.tz_localize(None)
+
+
+def _to_date(values):
+    return _to_timestamp(values).dt.normalize()
+
+
+COERCERS = {"int": _to_int, "numeric": _to_numeric, "date": _to_date, "timestamp": _to_timestamp}
+
+
+def coerce_sheet(df, sheet_type, columns=None):
+    """Convert the typed columns of a sheet in place of per-row SQL casts.
+
+    `columns`, if given, limits conversion to those typed columns; the others
+    keep the file's text. Blank and 'NaN' cells become missing values.
+    Returns (df, unparsed), where unparsed maps each column to the number of
+    non-blank values that could not be converted (they are set to missing).
+    """
+    unparsed = {}
+    for col, kind in SHEET_COLUMN_TYPES.get(sheet_type, {}).items():
+        if col not in df.columns or (columns is not None and col not in columns):
+            continue
+        values = blank_to_na(df[col])
+        converted = COERCERS[kind](values)
+        unparsed[col] = int((values.notna() & converted.isna()).sum())
+        df[col] = converted
+    return df, unparsed
+
+
+def session_kind(codes):
+    """Map Session_Code values to their SESSION_KIND_PREFIXES kind (missing if no prefix matches)."""
+    codes = codes.astype("string")
+    kinds = pd.Series(pd.NA, index=codes.index, dtype="string")
+    for prefix in sorted(SESSION_KIND_PREFIXES, key=len, reverse=True):
+        kinds = kinds.mask(kinds.isna() & codes.str.startswith(prefix).fillna(False), SESSION_KIND_PREFIXES[prefix])
+    return kinds
@@ -1,9 +1,8 @@
 from sqlalchemy import text
 from deployment_scripts.connection import get_engine
 
-engine = get_engine()
-
 def add_constraints_and_timestamps():
+    engine = get_engine("ddl")
     try:
         with engine.begin() as conn:
 
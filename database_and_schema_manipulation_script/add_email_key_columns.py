@@ -0,0 +1,67 @@
+import sys
+from sqlalchemy import text
+
+from deployment_scripts.catalog_cache import CatalogCache
+from deployment_scripts.connection import get_engine, lift_statement_timeout
+
+EMAIL_KEY_COLUMN = "email_key"
+
+# Tables joined on email by the pipeline, and the column holding the email.
+# Queries join on email_key instead of the raw value.
+EMAIL_COLUMNS = {
+    ("raw", "student_details"): "email",
+    ("old", "general_information_sheet"): "Email",
+    ("old", "assignment_monitoring_data"): "Email",
+    ("old", "student_session_information"): "Email",
+    ("old", "incubator_quiz_monitoring"): "user_id",
+}
+
+
+def add_email_key(conn, catalog, schema, table_name, email_column):
+    """Add the stored generated email_key column and its btree index to one table."""
+    columns = catalog.columns(schema, table_name)
+    if not columns:
+        print(f"** Skipping {schema}.{table_name}: table not found.")
+        return
+    if email_column not in columns:
+        print(f"** Skipping {schema}.{table_name}: column '{email_column}' not found.")
+        return
+
+    if EMAIL_KEY_COLUMN in columns:
+        print(f"* {schema}.{table_name}.{EMAIL_KEY_COLUMN} already exists.")
+    else:
+        # Rewrites the table once; afterwards Postgres keeps the key in step on every insert/update
+        conn.execute(text(f"""
+            ALTER TABLE {schema}."{table_name}"
+            ADD COLUMN {EMAIL_KEY_COLUMN} TEXT
+            GENERATED ALWAYS AS (lower(btrim("{email_column}"::TEXT))) STORED
+        """))
+        print(f"* Added {schema}.{table_name}.{EMAIL_KEY_COLUMN} = lower(btrim(\"{email_column}\"))")
+
+    conn.execute(text(f"""
+        CREATE INDEX IF NOT EXISTS "{table_name}_{EMAIL_KEY_COLUMN}_idx"
+        ON {schema}."{table_name}" ({EMAIL_KEY_COLUMN})
+    """))
+    catalog.invalidate(schema, table_name)
+
+
+def add_email_key_columns():
+    engine = get_engine("ddl")
+    catalog = CatalogCache(engine)
+    for schema in {schema for schema, _ in EMAIL_COLUMNS}:
+        catalog.prefetch(schema, [table for s, table in EMAIL_COLUMNS if s == schema])
+
+    for (schema, table_name), email_column in EMAIL_COLUMNS.items():
+        # One transaction per table; a failure leaves that table unchanged
+        try:
+            with engine.begin() as conn:
+                # Adding a stored generated column rewrites the whole table
+                lift_statement_timeout(conn)
+                add_email_key(conn, catalog, schema, table_name, email_column)
+        except Exception as e:
+            print(f"! Failed to add {EMAIL_KEY_COLUMN} to {schema}.{table_name}: {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    add_email_key_columns()
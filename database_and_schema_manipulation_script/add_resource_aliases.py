@@ -0,0 +1,52 @@
+import argparse
+import sys
+
+from deployment_scripts.catalog_cache import CatalogCache
+from deployment_scripts.connection import add_env_argument, get_engine
+from deployment_scripts.csv_reader import read_sheet
+from deployment_scripts.ingest_ledger import INGESTED_AT_COLUMN
+from deployment_scripts.resource_alias import (TITLE_SOURCES, add_alias, ensure_resource_alias, restamp_aliased_rows,
+                                               sync_title_aliases)
+
+REQUIRED_COLUMNS = ["category", "alias", "resource_id"]
+
+
+def add_resource_aliases(csv_path=None):
+    """Create raw.resource_alias, sync current resource titles, then add the aliases listed in `csv_path`."""
+    engine = get_engine("bulk_load")
+    with engine.begin() as conn:
+        ensure_resource_alias(conn)
+        print(f"* {sync_title_aliases(conn)} resource title(s) added to raw.resource_alias")
+
+        if not csv_path:
+            return
+        df = read_sheet(csv_path)
+        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing:
+            print(f"! {csv_path} is missing column(s): {', '.join(missing)}")
+            sys.exit(1)
+
+        df = df.dropna(subset=REQUIRED_COLUMNS)
+        df["category"] = df["category"].str.strip()
+        for row in df.itertuples(index=False):
+            add_alias(conn, row.category, row.alias, int(row.resource_id))
+        print(f"* {len(df)} alias(es) from {csv_path} mapped in raw.resource_alias")
+
+        # Rows behind the old -> raw watermark are re-stamped so the next incremental run resolves them
+        catalog = CatalogCache(engine)
+        for category, aliases in df.groupby("category")["alias"]:
+            source = TITLE_SOURCES.get(category, (None,))[0]
+            if source is None or INGESTED_AT_COLUMN not in catalog.columns("old", source):
+                print(f"** No old.* rows to re-stamp for category '{category}'; run old -> raw with --full if needed")
+                continue
+            restamped = restamp_aliased_rows(conn, category, aliases)
+            print(f"   - {restamped} old.{source} row(s) re-stamped for the next old -> raw run")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and fill raw.resource_alias")
+    parser.add_argument("csv_path", nargs="?",
+                        help="Optional CSV with columns category, alias, resource_id (e.g. old titles of renamed resources)")
+    add_env_argument(parser)
+    args = parser.parse_args()
+    add_resource_aliases(args.csv_path)
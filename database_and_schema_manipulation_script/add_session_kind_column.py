@@ -0,0 +1,67 @@
+import sys
+from sqlalchemy import text
+
+from deployment_scripts.catalog_cache import CatalogCache
+from deployment_scripts.connection import get_engine, lift_statement_timeout
+from deployment_scripts.csv_reader import SESSION_KIND_PREFIXES
+from deployment_scripts.ingest_ledger import INGESTED_AT_COLUMN, ensure_ingested_at
+
+SCHEMA = "old"
+TABLE_NAME = "student_session_information"
+
+
+def session_kind_case(column='"Session_Code"'):
+    """SQL CASE mapping Session_Code to its kind, longest prefix first (same rule as csv_reader.session_kind)."""
+    branches = "\n".join(
+        f"            WHEN left({column}, {len(prefix)}) = '{prefix}' THEN '{SESSION_KIND_PREFIXES[prefix]}'"
+        for prefix in sorted(SESSION_KIND_PREFIXES, key=len, reverse=True)
+    )
+    return f"CASE\n{branches}\n        END"
+
+
+def add_session_kind_column():
+    engine = get_engine("ddl")
+    catalog = CatalogCache(engine)
+    target = f'{SCHEMA}."{TABLE_NAME}"'
+
+    if not catalog.exists(SCHEMA, TABLE_NAME):
+        print(f"** Skipping {target}: table not found.")
+        return
+
+    try:
+        with engine.begin() as conn:
+            # The backfill and index builds scan the whole table
+            lift_statement_timeout(conn)
+            if INGESTED_AT_COLUMN not in catalog.columns(SCHEMA, TABLE_NAME):
+                ensure_ingested_at(conn, SCHEMA, TABLE_NAME)
+            conn.execute(text(f'ALTER TABLE {target} ADD COLUMN IF NOT EXISTS "session_kind" TEXT'))
+
+            # Backfill only rows whose kind changes; ingested_at is left alone so the
+            # next incremental old -> raw run does not re-propagate the whole table
+            kind = session_kind_case()
+            changed = conn.execute(text(f"""
+                UPDATE {target}
+                SET "session_kind" = {kind}
+                WHERE "session_kind" IS DISTINCT FROM {kind}
+            """)).rowcount
+            print(f"* Classified {changed} row(s) of {target} by Session_Code prefix")
+            if changed:
+                print("   - Rows already behind the old -> raw watermark are not re-sent; "
+                      "run the old -> raw script once with --full if a new prefix was added")
+
+            # One partial index per kind, so each old -> raw query reads only its slice
+            for kind_name in sorted(set(SESSION_KIND_PREFIXES.values())):
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS "{TABLE_NAME}_{kind_name}_idx"
+                    ON {target} ({INGESTED_AT_COLUMN})
+                    WHERE "session_kind" = '{kind_name}'
+                """))
+                print(f"   - Index on {INGESTED_AT_COLUMN} WHERE session_kind = '{kind_name}' ensured")
+            catalog.invalidate(SCHEMA, TABLE_NAME)
+    except Exception as e:
+        print(f"! Failed to add session_kind to {target}: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    add_session_kind_column()
@@ -4,9 +4,6 @@ import sys
 
 from deployment_scripts.connection import get_engine, get_session, metadata
 
-# Connect to PostgreSQL
-engine = get_engine()
-
 target_schema = "intermediate"
 
 # ENUM definitions
@@ -30,6 +27,7 @@ alter_statements = [
 
 
 def create_enums_and_alter_tables(schema, enum_definitions):
+    engine = get_engine("ddl")
     try:
         with engine.begin() as conn:
             # Ensure schema exists
@@ -91,5 +89,5 @@ def create_enums_and_alter_tables(schema, enum_definitions):
         traceback.print_exc()
         print("Error during ENUM or PK creation:", e)
 
-# Execute all steps
-create_enums_and_alter_tables(target_schema, enum_definitions)
+if __name__ == "__main__":
+    create_enums_and_alter_tables(target_schema, enum_definitions)
@@ -1,26 +1,26 @@
+import argparse
 import sys
 import os
-from dotenv import load_dotenv
 import psycopg
 from psycopg import sql, errors
 
-# Load credentials from config.env
-load_dotenv("config.env")
-
-PG_USER = os.getenv("DB_USER")
-PG_PASSWORD = os.getenv("DB_PASSWORD")
-PG_HOST = os.getenv("DB_HOST")
-PG_PORT = os.getenv("DB_PORT")
+from deployment_scripts.connection import add_env_argument, get_config
 
 def create_database_and_schema(db_name, schema_name):
+    # Load credentials from config.env (or config.<env>.env with --env)
+    config = get_config()
+    credentials = dict(
+        user=config["DB_USER"],
+        password=config["DB_PASSWORD"],
+        host=config["DB_HOST"],
+        port=config["DB_PORT"],
+    )
+
     try:
         # Connect to the default 'postgres' database
         with psycopg.connect(
             dbname="postgres",
-            user=PG_USER,
-            password=PG_PASSWORD,
-            host=PG_HOST,
-            port=PG_PORT,
+            **credentials,
             autocommit=True
         ) as conn:
             with conn.cursor() as cur:
@@ -36,10 +36,7 @@ def create_database_and_schema(db_name, schema_name):
         # Connect to the new database to create the schema
         with psycopg.connect(
             dbname=db_name,
-            user=PG_USER,
-            password=PG_PASSWORD,
-            host=PG_HOST,
-            port=PG_PORT,
+            **credentials,
             autocommit=True
         ) as conn:
             with conn.cursor() as cur:
@@ -50,10 +47,9 @@ def create_database_and_schema(db_name, schema_name):
         sys.exit(1)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python create_db_and_schema.py <database_name> <schema_name>")
-        sys.exit(1)
-
-    database_name = sys.argv[1]
-    schema_name = sys.argv[2]
-    create_database_and_schema(database_name, schema_name)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create a database and a schema inside it")
+    parser.add_argument("database_name")
+    parser.add_argument("schema_name")
+    add_env_argument(parser)
+    args = parser.parse_args()
+    create_database_and_schema(args.database_name, args.schema_name)
@@ -4,8 +4,6 @@ import sys
 
 from deployment_scripts.connection import get_engine, get_session, metadata
 
-engine = get_engine()
-
 # ENUM definitions
 enum_definitions = {
     "gender_enum": ['F', 'M', 'O'],
@@ -20,6 +18,7 @@ target_schema = "raw"
 
 
 def create_or_update_enums(schema, enum_definitions):
+    engine = get_engine("ddl")
 
     try:
         with engine.begin() as conn:
@@ -100,5 +99,5 @@ def create_or_update_enums(schema, enum_definitions):
         print("Error during ENUM creation/update:", e)
 
 
-# Run it
-create_or_update_enums(target_schema, enum_definitions)
\ No newline at end of file
+if __name__ == "__main__":
+    create_or_update_enums(target_schema, enum_definitions)
\ No newline at end of file
@@ -9,8 +9,6 @@ TARGET_SCHEMA = "final"
 # Set to True to drop existing tables before creating
 DROP_IF_EXISTS = False
 
-engine = get_engine()
-
 # Helper to prefix CREATE TABLE with schema and table name
 def wrap_create(schema: str, table: str, body_sql: str) -> str:
     # Ensure the body_sql does NOT already contain a CREATE TABLE line.
@@ -155,6 +153,7 @@ def drop_table_if_exists(conn, schema: str, table: str):
     print(f"Dropped table if existed: {schema}.{table}")
 
 def run():
+    engine = get_engine("ddl")
     with engine.begin() as conn:
         # ensure target schema exists (create if missing)
         try:
@@ -4,8 +4,6 @@ from sqlalchemy import text
 
 from deployment_scripts.connection import get_engine, get_session, metadata
 
-engine = get_engine()
-
 # Student Assignment (dedupe on student_id, resource_id, submitted_at)
 DUP_CHECK_ASSIGNMENT = text("""
     SELECT student_id, resource_id, submitted_at, COUNT(*) AS cnt
@@ -127,6 +125,7 @@ CREATE_INDEXES = [
 
 
 def main():
+    engine = get_engine()
     try:
         with engine.begin() as conn:
             # Assignment: check + dedupe
@@ -2,8 +2,6 @@ import os
 import logging
 from sqlalchemy import create_engine
 
-import psycopg2
-from psycopg2 import sql, errors
 from deployment_scripts.connection import get_engine, get_session, metadata
  
 # -------------------------------
@@ -54,7 +52,7 @@ def check_connection(raw_conn):
             logging.info(f"PostgreSQL backend process ID: {user_info[0][5]}")
 
 
-        engine = get_engine()
+        engine = get_engine("ddl")
         host = engine.url.host or "localhost"
         server_ip = user_info[3]
 
@@ -74,7 +72,7 @@ def check_connection(raw_conn):
 # Function to rename schemas
 # -------------------------------
 def rename_schemas():
-    engine = get_engine()
+    engine = get_engine("ddl")
  
     # Use raw DBAPI connection to enable autocommit for DDL
     raw_conn = engine.raw_connection()
@@ -0,0 +1,108 @@
+import sys
+from sqlalchemy import text
+
+from deployment_scripts.catalog_cache import CatalogCache
+from deployment_scripts.connection import get_engine, lift_statement_timeout
+
+# Monitoring tables read by the old -> raw upserts, and the types their TEXT
+# columns are converted to. Matches csv_reader.SHEET_COLUMN_TYPES.
+RETYPE_COLUMNS = {
+    "student_session_information": {
+        "Duration_in_secs": "INTEGER",
+        "Duration_in_hrs": "NUMERIC",
+        "watched_on": "DATE",
+    },
+    "assignment_monitoring_data": {
+        "submitted_at": "TIMESTAMP",
+    },
+    "incubator_quiz_monitoring": {
+        "value": "INTEGER",
+    },
+}
+
+# format_type() names of the target types, to skip columns already converted
+TYPE_NAMES = {
+    "INTEGER": "integer",
+    "NUMERIC": "numeric",
+    "DATE": "date",
+    "TIMESTAMP": "timestamp without time zone",
+}
+
+# Casts that return NULL instead of failing on blanks, 'NaN' and malformed values.
+# Declared STABLE: date and timestamp input depends on DateStyle and TimeZone.
+TRY_CAST_FUNCTIONS = {
+    "INTEGER": "NULLIF(NULLIF(TRIM(value), ''), 'NaN')::NUMERIC::INTEGER",
+    "NUMERIC": "NULLIF(NULLIF(TRIM(value), ''), 'NaN')::NUMERIC",
+    # Same rule as csv_reader._to_timestamp: offsets are converted to UTC, values
+    # without one are kept as written (the session TimeZone is set to UTC)
+    "DATE": "(NULLIF(NULLIF(TRIM(value), ''), 'NaN')::TIMESTAMPTZ AT TIME ZONE 'UTC')::DATE",
+    "TIMESTAMP": "NULLIF(NULLIF(TRIM(value), ''), 'NaN')::TIMESTAMPTZ AT TIME ZONE 'UTC'",
+}
+
+
+def create_try_cast_functions(conn):
+    for sql_type, expression in TRY_CAST_FUNCTIONS.items():
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION pg_temp.try_{sql_type.lower()}(value TEXT) RETURNS {sql_type} AS $$
+            BEGIN
+                RETURN {expression};
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql STABLE
+        """))
+
+
+def retype_table(conn, catalog, table_name, columns, schema="old"):
+    existing = catalog.columns(schema, table_name)
+    if not existing:
+        print(f"** Skipping {schema}.{table_name}: table not found.")
+        return
+
+    for column, sql_type in columns.items():
+        if column not in existing:
+            print(f"** Skipping {schema}.{table_name}.{column}: column not found.")
+            continue
+        if existing[column] == TYPE_NAMES[sql_type]:
+            print(f"* {schema}.{table_name}.{column} is already {sql_type}.")
+            continue
+
+        cast = f'pg_temp.try_{sql_type.lower()}("{column}"::TEXT)'
+        lost = conn.execute(text(f"""
+            SELECT COUNT(*) FROM {schema}."{table_name}"
+            WHERE NULLIF(NULLIF(TRIM("{column}"::TEXT), ''), 'NaN') IS NOT NULL
+              AND {cast} IS NULL
+        """)).scalar()
+        conn.execute(text(f"""
+            ALTER TABLE {schema}."{table_name}"
+            ALTER COLUMN "{column}" TYPE {sql_type} USING {cast}
+        """))
+        print(f"* Retyped {schema}.{table_name}.{column} to {sql_type}")
+        if lost:
+            print(f"   - {lost} value(s) could not be converted and were set to NULL")
+
+    catalog.invalidate(schema, table_name)
+
+
+def retype_old_monitoring_columns():
+    engine = get_engine("ddl")
+    catalog = CatalogCache(engine)
+    catalog.prefetch("old", RETYPE_COLUMNS)
+
+    for table_name, columns in RETYPE_COLUMNS.items():
+        # One transaction per table; a failure leaves that table unchanged
+        try:
+            with engine.begin() as conn:
+                # ALTER TYPE rewrites the whole table
+                lift_statement_timeout(conn)
+                # Values without an offset are read as UTC, then converted back unchanged
+                conn.execute(text("SET LOCAL TimeZone = 'UTC'"))
+                create_try_cast_functions(conn)
+                retype_table(conn, catalog, table_name, columns)
+        except Exception as e:
+            print(f"! Failed to retype old.{table_name}: {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    retype_old_monitoring_columns()
@@ -0,0 +1,223 @@
+import hashlib
+import os
+
+from sqlalchemy import bindparam, text
+
+LEDGER_TABLE = "meta.ingest_ledger"
+CHECKPOINT_TABLE = "meta.ingest_checkpoint"
+WATERMARK_TABLE = "meta.propagation_watermark"
+HASH_BLOCK_BYTES = 1024 * 1024
+
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+
+# Set to now() by the loaders on every inserted or updated old.* row
+INGESTED_AT_COLUMN = "ingested_at"
+
+# A watermark must not pass rows that are still being written: rows of an
+# open transaction carry its start time but only become visible at commit.
+# So the next lower bound is the start of the oldest open transaction, or
+# now() if there is none. Rows at the bound may be read twice; the
+# consumers upsert, so that is harmless.
+SAFE_WATERMARK_QUERY = text("""
+    SELECT LEAST(now(), MIN(xact_start))
+    FROM pg_stat_activity
+    WHERE datname = current_database()
+      AND backend_type = 'client backend'
+      AND pid <> pg_backend_pid()
+""")
+
+
+def file_fingerprint(path):
+    """Return (size_bytes, sha256 hex) of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return os.path.getsize(path), digest.hexdigest()
+
+
+def ensure_ledger(conn):
+    conn.execute(text("CREATE SCHEMA IF NOT EXISTS meta"))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            file_size BIGINT,
+            sha256 TEXT NOT NULL,
+            row_count BIGINT,
+            target_table TEXT NOT NULL,
+            loader TEXT NOT NULL,
+            duration_secs NUMERIC(12, 3),
+            status TEXT NOT NULL,
+            error TEXT,
+            loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE INDEX IF NOT EXISTS ingest_ledger_success_idx
+        ON {LEDGER_TABLE} (target_table, sha256)
+        WHERE status = '{STATUS_SUCCESS}'
+    """))
+    # Progress of streamed loads, committed with each block (see get_checkpoint)
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+            target_table TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            byte_offset BIGINT NOT NULL,
+            rows_done BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (target_table, sha256)
+        )
+    """))
+    # High-water mark of each incremental old -> raw task (see get_watermark)
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            task TEXT PRIMARY KEY,
+            watermark TIMESTAMPTZ NOT NULL,
+            row_count BIGINT,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+
+
+def ensure_ingested_at(conn, schema, table_name):
+    """Add the ingested_at column and its index to a table.
+
+    Existing rows get the time the column was added.
+    """
+    conn.execute(text(f"""
+        ALTER TABLE {schema}."{table_name}"
+        ADD COLUMN IF NOT EXISTS {INGESTED_AT_COLUMN} TIMESTAMPTZ NOT NULL DEFAULT now()
+    """))
+    conn.execute(text(f"""
+        CREATE INDEX IF NOT EXISTS "{table_name}_{INGESTED_AT_COLUMN}_idx"
+        ON {schema}."{table_name}" ({INGESTED_AT_COLUMN})
+    """))
+
+
+def rejects_table(table_name):
+    return f'old."{table_name}_rejects"'
+
+
+def ensure_rejects_table(conn, table_name):
+    """Create old.<table_name>_rejects: one row per distinct rejected source row, keyed by a hash of its values."""
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {rejects_table(table_name)} (
+            row_key TEXT PRIMARY KEY,
+            reasons TEXT NOT NULL,
+            row_data JSONB NOT NULL,
+            rejected_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+
+
+def quarantine_frame(conn, table_name, rejects):
+    """Write rows of a DataFrame with a 'reasons' column to old.<table_name>_rejects.
+
+    The other columns are stored as the row's JSONB, missing values as null.
+    Returns the number of rows written.
+    """
+    rows = rejects.drop(columns="reasons").to_json(orient="records", date_format="iso")
+    result = conn.execute(text(f"""
+        WITH rejected AS (
+            SELECT row_data, reasons
+            FROM jsonb_array_elements(CAST(:rows AS JSONB)) WITH ORDINALITY AS r(row_data, n)
+            JOIN unnest(CAST(:reasons AS TEXT[])) WITH ORDINALITY AS q(reasons, n) USING (n)
+        )
+        INSERT INTO {rejects_table(table_name)} (row_key, reasons, row_data)
+        SELECT DISTINCT ON (md5(row_data::TEXT)) md5(row_data::TEXT), reasons, row_data
+        FROM rejected
+        ON CONFLICT (row_key) DO UPDATE SET
+            reasons = EXCLUDED.reasons,
+            rejected_at = now()
+    """), {"rows": rows, "reasons": list(rejects["reasons"])})
+    return result.rowcount
+
+
+def loaded_hashes(conn, target_table, hashes):
+    """Return the subset of `hashes` already loaded successfully into `target_table`."""
+    hashes = list(hashes)
+    if not hashes:
+        return set()
+    rows = conn.execute(text(f"""
+        SELECT DISTINCT sha256 FROM {LEDGER_TABLE}
+        WHERE status = '{STATUS_SUCCESS}'
+          AND target_table = :target_table
+          AND sha256 IN :hashes
+    """).bindparams(bindparam("hashes", expanding=True)), {"target_table": target_table, "hashes": hashes})
+    return {row.sha256 for row in rows}
+
+
+def record_ingest(engine, file_path, file_size, sha256, target_table, loader,
+                  row_count=None, duration=None, status=STATUS_SUCCESS, error=None):
+    """Append one ledger row in its own transaction, so failed loads are recorded too."""
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO {LEDGER_TABLE}
+                (file_path, file_size, sha256, row_count, target_table, loader, duration_secs, status, error)
+            VALUES
+                (:file_path, :file_size, :sha256, :row_count, :target_table, :loader, :duration, :status, :error)
+        """), {
+            "file_path": os.path.abspath(file_path),
+            "file_size": file_size,
+            "sha256": sha256,
+            "row_count": row_count,
+            "target_table": target_table,
+            "loader": loader,
+            "duration": round(duration, 3) if duration is not None else None,
+            "status": status,
+            "error": str(error)[:2000] if error is not None else None,
+        })
+
+
+def get_checkpoint(conn, target_table, sha256):
+    """Return (byte_offset, rows_done) of the last committed block, or None.
+
+    Keyed by content hash, so an edited file never resumes at a stale offset.
+    """
+    row = conn.execute(text(f"""
+        SELECT byte_offset, rows_done FROM {CHECKPOINT_TABLE}
+        WHERE target_table = :target_table AND sha256 = :sha256
+    """), {"target_table": target_table, "sha256": sha256}).first()
+    return (row.byte_offset, row.rows_done) if row else None
+
+
+def save_checkpoint(conn, target_table, sha256, file_path, byte_offset, rows_done):
+    """Record progress inside the caller's transaction, so it commits with the block's rows."""
+    conn.execute(text(f"""
+        INSERT INTO {CHECKPOINT_TABLE} (target_table, sha256, file_path, byte_offset, rows_done)
+        VALUES (:target_table, :sha256, :file_path, :byte_offset, :rows_done)
+        ON CONFLICT (target_table, sha256) DO UPDATE SET
+            file_path = EXCLUDED.file_path,
+            byte_offset = EXCLUDED.byte_offset,
+            rows_done = EXCLUDED.rows_done,
+            updated_at = now()
+    """), {"target_table": target_table, "sha256": sha256, "file_path": os.path.abspath(file_path),
+           "byte_offset": byte_offset, "rows_done": rows_done})
+
+
+def clear_checkpoint(conn, target_table, sha256):
+    conn.execute(text(f"""
+        DELETE FROM {CHECKPOINT_TABLE}
+        WHERE target_table = :target_table AND sha256 = :sha256
+    """), {"target_table": target_table, "sha256": sha256})
+
+
+def get_watermark(conn, task):
+    """Return the lower bound for the task's next incremental run, or None if it never ran."""
+    return conn.execute(text(f"SELECT watermark FROM {WATERMARK_TABLE} WHERE task = :task"),
+                        {"task": task}).scalar()
+
+
+def save_watermark(conn, task, watermark, row_count=None):
+    """Record a task's watermark inside the caller's transaction, so it commits with the task's rows."""
+    conn.execute(text(f"""
+        INSERT INTO {WATERMARK_TABLE} (task, watermark, row_count)
+        VALUES (:task, :watermark, :row_count)
+        ON CONFLICT (task) DO UPDATE SET
+            watermark = EXCLUDED.watermark,
+            row_count = EXCLUDED.row_count,
+            updated_at = now()
+    """), {"task": task, "watermark": watermark, "row_count": row_count})
@@ -1,35 +1,63 @@
-import pandas as pd
-from sqlalchemy import text
-import os
-import sys
+import argparse
+import time
 
-# Load environment variables
-
-connection_dir = r"C:\Users\vigya\OneDrive - VigyanShaala\Desktop\add_connection_file\deployment_scripts"
-if connection_dir not in sys.path:
-    sys.path.append(connection_dir)
-
-from connection import get_engine
+from deployment_scripts.bulk_load import copy_dataframe
+from deployment_scripts.connection import add_env_argument, get_engine
+from deployment_scripts.csv_reader import iter_sheet_chunks
+from deployment_scripts.ingest_ledger import STATUS_FAILED, ensure_ledger, file_fingerprint, loaded_hashes, record_ingest
 
 TABLE_NAME = "raw.general_information_sheet"  # Change this to your target table
 
-
-# Database connection
-engine = get_engine()
-
-# CSV to PostgreSQL in chunks
-
-csv_file = r"C:\Users\vigya\Downloads\registration_sheet\google_form_records_sheet.csv"  # Change to your CSV path
-df = pd.read_csv(csv_file, encoding='iso-8859-1')
-
-df.to_sql(
-    name=TABLE_NAME.split('.')[-1],  # Table name without schema
-    con=engine,
-    schema=TABLE_NAME.split('.')[0] if '.' in TABLE_NAME else None,
-    if_exists="append",  # Append without overwriting
-    index=False,
-    method="multi",  # Enables bulk insert
-    chunksize=1000   # Adjust chunk size for your system
-)
-
-print(f"Successfully inserted {len(df)} records into {TABLE_NAME} in chunks.")
\ No newline at end of file
+CSV_FILE = r"C:\Users\vigya\Downloads\registration_sheet\google_form_records_sheet.csv"  # Change to your CSV path
+
+CHUNK_ROWS = 20000  # Rows held in memory at a time
+
+LOADER_NAME = "insert_new_data"
+
+
+def insert_registrations(csv_file=CSV_FILE, chunk_rows=CHUNK_ROWS, force=False):
+    # Database connection
+    engine = get_engine("bulk_load")
+
+    # Appending the same export twice would duplicate every registration
+    file_size, sha256 = file_fingerprint(csv_file)
+    with engine.begin() as conn:
+        ensure_ledger(conn)
+        if not force and loaded_hashes(conn, TABLE_NAME, [sha256]):
+            print(f"{csv_file} was already loaded into {TABLE_NAME} (see meta.ingest_ledger); pass --force to append it again.")
+            return
+
+    # Stream the CSV in fixed-size chunks, each pushed through COPY.
+    # Values stay as text so every chunk has the same shape and COPY casts
+    # them to the table's column types. Encoding and delimiter are sniffed.
+    reader = iter_sheet_chunks(csv_file, "registration", chunk_rows)
+
+    total_rows = 0
+    start = time.time()
+    try:
+        with engine.begin() as conn:  # Append is all-or-nothing
+            for chunk in reader:
+                total_rows += copy_dataframe(conn, TABLE_NAME, chunk)
+                elapsed = max(time.time() - start, 1e-6)
+                print(f"   - {total_rows} rows copied ({total_rows / elapsed:,.0f} rows/s)")
+    except Exception as e:
+        record_ingest(engine, csv_file, file_size, sha256, TABLE_NAME, LOADER_NAME,
+                      duration=time.time() - start, status=STATUS_FAILED, error=e)
+        raise
+
+    elapsed = time.time() - start
+    record_ingest(engine, csv_file, file_size, sha256, TABLE_NAME, LOADER_NAME, row_count=total_rows, duration=elapsed)
+    print(f"Successfully inserted {total_rows} records into {TABLE_NAME} in {elapsed:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append Google Form registration export to raw.general_information_sheet")
+    parser.add_argument("csv_file", nargs="?", default=CSV_FILE, help="Registration CSV export")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help=f"Rows read and copied per chunk (default: {CHUNK_ROWS})")
+    parser.add_argument("--force", action="store_true",
+                        help="Append the file even if meta.ingest_ledger shows it was loaded before")
+    add_env_argument(parser)
+    args = parser.parse_args()
+
+    insert_registrations(args.csv_file, args.chunk_rows, args.force)
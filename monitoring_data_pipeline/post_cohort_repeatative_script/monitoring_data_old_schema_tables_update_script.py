@@ -1,197 +1,441 @@
+import argparse
+import multiprocessing
 import os
 import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import pandas as pd
-from sqlalchemy import text, inspect
-from sqlalchemy import inspect
-
-from deployment_scripts.connection import get_engine, get_session, metadata
-
-def import_csv_to_db(folder_path, engine, filter_text=""):
-    files = os.listdir(folder_path)
-    inspector = inspect(engine)
+from sqlalchemy import text
+
+from deployment_scripts.bulk_load import stage_and_upsert
+from deployment_scripts.catalog_cache import CatalogCache
+from deployment_scripts.connection import add_env_argument, clamp_workers, get_engine, get_session, metadata, pool_status
+from deployment_scripts.csv_reader import (COLUMN_TYPE_NAMES, SHEET_COLUMN_TYPES, SHEET_SIGNATURES, blank_to_na,
+                                           coerce_sheet, detect_sheet_type, iter_sheet_blocks, read_sheet,
+                                           session_kind, sniff_csv)
+from deployment_scripts.ingest_ledger import (INGESTED_AT_COLUMN, STATUS_FAILED, clear_checkpoint, ensure_ingested_at,
+                                              ensure_ledger, ensure_rejects_table, file_fingerprint, get_checkpoint,
+                                              loaded_hashes, quarantine_frame, record_ingest, rejects_table,
+                                              save_checkpoint)
+
+LOADER_NAME = "monitoring_data_old_schema_tables_update_script"
+
+# Upsert keys per sheet; each matches the table's <table>_user_data_key constraint
+QUIZ_KEYS = ["user_id", "data_fields"]
+SESSION_KEYS = ["Email", "Session_Code"]
+ASSIGNMENT_KEYS = ["assignment_id", "submitted_at", "Email"]
+SHEET_KEYS = {"quiz": QUIZ_KEYS, "session": SESSION_KEYS, "assignment": ASSIGNMENT_KEYS}
+
+# Columns upserted per sheet (None = every column in the file)
+SHEET_LOAD_COLUMNS = {"quiz": ["user_id", "data_fields", "value"], "session": SHEET_SIGNATURES["session"] + ["session_kind"],
+                      "assignment": None}
+
+# Rows per block in --chunk-rows streaming mode
+DEFAULT_CHUNK_ROWS = 100000
+
+def coerced_columns(catalog, table_name, sheet_type):
+    """Typed sheet columns that old.<table_name> stores with their real type (or will create).
+
+    A column that is still TEXT (not yet retyped) keeps the file's text: a
+    re-rendered value, such as submitted_at in the assignment key, would not
+    match the text already stored and the row would be inserted twice.
+    """
+    existing = catalog.columns("old", table_name)
+    return {col for col, kind in SHEET_COLUMN_TYPES.get(sheet_type, {}).items()
+            if existing.get(col, COLUMN_TYPE_NAMES[kind]) == COLUMN_TYPE_NAMES[kind]}
+
+
+def report_text_columns(catalog, table_name, sheet_type):
+    for col in sorted(set(SHEET_COLUMN_TYPES.get(sheet_type, {})) - coerced_columns(catalog, table_name, sheet_type)):
+        print(f"** old.{table_name}.{col} is still {catalog.columns('old', table_name)[col]}; loading it as text "
+              f"(run retype_old_monitoring_columns to convert it)")
+
+
+def normalize_frame(df, sheet_type, columns=None):
+    """Coerce typed columns, derive session_kind for session sheets and split
+    off rows that cannot be upserted.
+
+    A row whose key value is present but cannot be converted (e.g. an
+    unparseable submitted_at) goes to the returned rejects frame with the
+    file's text and a 'reasons' column, for old.<table>_rejects. Rows with a
+    blank key value are dropped.
+    `columns` limits coercion to those typed columns (see coerced_columns).
+    Returns (df, rejects, unparsed counts per non-key column, dropped rows).
+    """
+    keys = SHEET_KEYS[sheet_type]
+    raw_keys = df[[col for col in keys if col in SHEET_COLUMN_TYPES.get(sheet_type, {})]].copy()
+    df, unparsed = coerce_sheet(df, sheet_type, columns)
+    if sheet_type == "session":
+        # Lets the old -> raw queries read their slice through a partial index instead of LIKE scans
+        df["session_kind"] = session_kind(df["Session_Code"])
+
+    failed = pd.DataFrame({col: blank_to_na(raw_keys[col]).notna() & df[col].isna() for col in raw_keys.columns},
+                          index=df.index, dtype=bool)
+    rejected = failed.any(axis=1)
+    rejects = df[rejected].copy()
+    for col in raw_keys.columns:
+        rejects[col] = raw_keys.loc[rejected, col]
+    rejects["reasons"] = failed[rejected].apply(lambda row: "; ".join(f"unparseable {col}" for col in row.index[row]),
+                                                axis=1).astype(object)
+
+    keep = ~rejected & df[keys].notna().all(axis=1)
+    unparsed = {col: count for col, count in unparsed.items() if col not in raw_keys.columns}
+    return df[keep], rejects, unparsed, int((~keep & ~rejected).sum())
+
+
+def parse_sheet(file_path, sheet_type, fmt, columns=None):
+    """Parse one CSV once, with the sniffed format and its sheet's dtypes, then normalize it.
+
+    No DB access, so it can run in a worker process.
+    Returns (df, rejects, unparsed counts per column, dropped rows, seconds).
+    """
+    start = time.time()
+    df = read_sheet(file_path, sheet_type, fmt)
+    df, rejects, unparsed, dropped = normalize_frame(df, sheet_type, columns)
+    return df, rejects, unparsed, dropped, time.time() - start
+
+
+def prepare_target(conn, catalog, table_name, sheet_type):
+    """Add the sheet's unique constraint, the session watched_on / session_kind columns and ingested_at if missing."""
+    schema = "old"
+    constraint_name = f"{table_name}_user_data_key"
+    target = f'{schema}."{table_name}"'
+    constraint_names = catalog.unique_constraints(schema, table_name)
+
+    if constraint_name not in constraint_names:
+        key_list = ", ".join(f'"{col}"' for col in SHEET_KEYS[sheet_type])
+        try:
+            conn.execute(text(f"""
+                ALTER TABLE {target}
+                ADD CONSTRAINT {constraint_name} UNIQUE ({key_list})
+            """))
+            catalog.invalidate(schema, table_name)
+            print(f"Added UNIQUE constraint on ({key_list}) to old.{table_name}")
+        except Exception as e:
+            print(f"** Warning: Could not add constraint. It might already exist. {e}")
+
+    # Check and add 'watched_on' column if missing
+    if sheet_type == "session" and "watched_on" not in catalog.columns(schema, table_name):
+        try:
+            conn.execute(text(f"""
+                ALTER TABLE {target}
+                ADD COLUMN "watched_on" DATE
+            """))
+            catalog.invalidate(schema, table_name)
+            print(f"## Added column 'watched_on' to old.{table_name}")
+        except Exception as e:
+            print(f"** Warning: Could not add 'watched_on' column. It might already exist or failed: {e}")
+
+    if sheet_type == "session" and "session_kind" not in catalog.columns(schema, table_name):
+        conn.execute(text(f"""
+            ALTER TABLE {target}
+            ADD COLUMN IF NOT EXISTS "session_kind" TEXT
+        """))
+        catalog.invalidate(schema, table_name)
+        print(f"## Added column 'session_kind' to old.{table_name}; run add_session_kind_column to classify "
+              f"existing rows and create its indexes")
+
+    # Stamp read by the incremental old -> raw propagation
+    if INGESTED_AT_COLUMN not in catalog.columns(schema, table_name):
+        ensure_ingested_at(conn, schema, table_name)
+        catalog.invalidate(schema, table_name)
+        print(f"## Added column '{INGESTED_AT_COLUMN}' to old.{table_name}")
+
+
+def upsert_frame(conn, table_name, sheet_type, df):
+    """COPY a normalized frame into staging and upsert it; returns (staged, inserted, updated)."""
+    columns = SHEET_LOAD_COLUMNS[sheet_type] or list(df.columns)
+    # Missing values ('', NaN, NaT) are written as NULL by COPY
+    return stage_and_upsert(conn, f'old."{table_name}"', df[columns], SHEET_KEYS[sheet_type],
+                            stamp_column=INGESTED_AT_COLUMN)
+
+
+def write_rejects(conn, table_name, rejects):
+    """Write rejected rows to old.<table_name>_rejects, creating it if needed; returns the rows written."""
+    if rejects.empty:
+        return 0
+    ensure_rejects_table(conn, table_name)
+    return quarantine_frame(conn, table_name, rejects)
+
+
+def load_sheet(engine, catalog, table_name, sheet_type, df, rejects):
+    """Upsert one parsed sheet into old.<table_name> and write its rejects; returns (staged, inserted, updated)."""
+    # Own pooled connection and transaction per file
+    with engine.begin() as conn:
+        prepare_target(conn, catalog, table_name, sheet_type)
+        write_rejects(conn, table_name, rejects)
+        if df.empty:
+            return 0, 0, 0
+        # Inform user that the upsert process has started
+        print(f"Upserting data into the {sheet_type} table. Please wait...")
+        result = upsert_frame(conn, table_name, sheet_type, df)
+        print(f"** Data upserted successfully in {sheet_type} table")
+    return result
+
+
+def stream_sheet(engine, catalog, table_name, sheet_type, file_path, fmt, chunk_rows, sha256, resume=False):
+    """Read, normalize and upsert a CSV block by block, printing rows done, rows/s and ETA.
+
+    Memory is bounded by `chunk_rows` whatever the file size. Each block is
+    committed together with a checkpoint (byte offset, rows done) in
+    meta.ingest_checkpoint. With `resume`, reading starts after the last
+    committed block; a replayed block is harmless because every target
+    upserts on its key.
+    Returns ((staged, inserted, updated), unparsed counts per column, rejected
+    rows, dropped rows, rows read before the resume point). The counts cover
+    this run only.
+    """
+    file = os.path.basename(file_path)
+    target = f"old.{table_name}"
+    totals = [0, 0, 0]
+    unparsed = Counter()
+    rejected = dropped = 0
+    start = time.time()
+
+    with engine.begin() as conn:
+        prepare_target(conn, catalog, table_name, sheet_type)
+        checkpoint = get_checkpoint(conn, target, sha256) if resume else None
+    columns = coerced_columns(catalog, table_name, sheet_type)
+    start_offset, rows_done = checkpoint or (0, 0)
+    resumed_rows = rows_done
+    if checkpoint:
+        print(f"* Resuming {file} after {rows_done:,} rows (byte {start_offset:,})")
+
+    for chunk, end_offset, total_bytes in iter_sheet_blocks(file_path, sheet_type, chunk_rows, fmt, start_offset):
+        rows_done += len(chunk)
+        chunk, chunk_rejects, chunk_unparsed, chunk_dropped = normalize_frame(chunk, sheet_type, columns)
+        unparsed.update(chunk_unparsed)
+        rejected += len(chunk_rejects)
+        dropped += chunk_dropped
+        with engine.begin() as conn:
+            write_rejects(conn, table_name, chunk_rejects)
+            if not chunk.empty:
+                for i, count in enumerate(upsert_frame(conn, table_name, sheet_type, chunk)):
+                    totals[i] += count
+            save_checkpoint(conn, target, sha256, file_path, end_offset, rows_done)
+
+        elapsed = max(time.time() - start, 1e-6)
+        bytes_done = end_offset - start_offset
+        eta = elapsed * (total_bytes - end_offset) / max(bytes_done, 1)
+        print(f"   - {file}: {rows_done:,} rows ({totals[0] / elapsed:,.0f} rows/s, "
+              f"{end_offset / max(total_bytes, 1):.0%}, ETA {eta:.0f}s)")
+
+    # Finished: the ledger records the load, the checkpoint is no longer needed
+    with engine.begin() as conn:
+        clear_checkpoint(conn, target, sha256)
+
+    return tuple(totals), dict(unparsed), rejected, dropped, resumed_rows
+
+
+def import_csv_to_db(folder_path, engine, filter_text="", workers=1, force=False, chunk_rows=0, resume=False):
+    """Load every matching CSV in the folder; returns one summary dict per file.
+
+    With workers > 1, files are parsed in a process pool and loaded on a
+    thread pool, one connection and transaction per file. Files that map to
+    the same old.<table> are loaded one at a time. Files whose content is
+    already recorded as loaded in meta.ingest_ledger are skipped unless
+    `force` is set. With chunk_rows > 0, each file is streamed in blocks of
+    that many rows instead of being held in memory, committing a checkpoint
+    per block; `resume` continues interrupted files from their last
+    checkpoint (see stream_sheet).
+    """
+    files = sorted(os.listdir(folder_path))
+    # One connection per loader thread, plus one for ledger writes from this thread
+    workers = clamp_workers(workers, "bulk_load", reserved=1)
 
     csv_files = [f for f in files if f.endswith(".csv") and (filter_text in f if filter_text else True)]
     if not csv_files:
         print("No matching CSV files found.")
-        return
+        return []
 
+    summary = {}
+    jobs = []
     for file in csv_files:
         file_path = os.path.join(folder_path, file)
         table_name = file.rsplit(".", 1)[0].replace(" ", "_").lower()
-        schema = "old"
-
-        df = pd.read_csv(file_path, encoding="ISO-8859-1", sep=None, engine='python')
-        if df.empty:
-            print(f"Skipping empty file: {file}")
+        summary[file] = {"file": file, "table": table_name, "rows": 0, "inserted": 0, "updated": 0,
+                         "elapsed": 0.0, "status": "ok"}
+
+        # Detect the sheet type from the header alone; unknown files are never parsed
+        fmt = sniff_csv(file_path)
+        sheet_type = detect_sheet_type(fmt.header)
+        if sheet_type is None:
+            print(f"Skipping {file}: header matches no known sheet type ({', '.join(SHEET_SIGNATURES)}).")
+            summary[file]["status"] = "rejected (unknown header)"
             continue
-
-        df.columns = df.columns.str.strip().str.replace('\ufeff', '')
-        columns = df.columns.tolist()
-
-        # Auto-detect schema type
-        if 'user_id' in columns and 'data_fields' in columns and 'value' in columns:
-            choice = "1"
-        elif 'email' in (c.lower() for c in columns) and 'session_code' in (c.lower() for c in columns):
-            choice = "2"
-        elif 'assignment_id' in columns and 'submitted_at' in columns and 'Email' in columns:
-            choice = "3"
+        jobs.append((file, file_path, table_name, sheet_type, fmt))
+        summary[file]["size"], summary[file]["sha256"] = file_fingerprint(file_path)
+
+    # Skip files whose exact content was already loaded into the same table
+    with engine.begin() as conn:
+        ensure_ledger(conn)
+        if not force:
+            done = set()
+            for table_name in {job[2] for job in jobs}:
+                hashes = {summary[job[0]]["sha256"] for job in jobs if job[2] == table_name}
+                done.update((table_name, h) for h in loaded_hashes(conn, f"old.{table_name}", hashes))
+            for job in [job for job in jobs if (job[2], summary[job[0]]["sha256"]) in done]:
+                print(f"Skipping {job[0]}: already loaded into old.{job[2]} (see meta.ingest_ledger).")
+                summary[job[0]]["status"] = "skipped (already loaded)"
+                jobs.remove(job)
+
+    # Catalog info for every target table in three queries, shared by all loads
+    catalog = CatalogCache(engine)
+    catalog.prefetch("old", {job[2] for job in jobs})
+    for table_name, sheet_type in {(job[2], job[3]) for job in jobs}:
+        report_text_columns(catalog, table_name, sheet_type)
+
+    table_locks = defaultdict(threading.Lock)
+
+    def load(file, table_name, sheet_type, df, rejects):
+        with table_locks[table_name]:
+            start = time.time()
+            result = load_sheet(engine, catalog, table_name, sheet_type, df, rejects)
+            return result, time.time() - start
+
+    def ledger(file, **fields):
+        entry = summary[file]
+        record_ingest(engine, os.path.join(folder_path, file), entry["size"], entry["sha256"],
+                      f"old.{entry['table']}", LOADER_NAME, duration=entry["elapsed"], **fields)
+
+    def report_coercion(file, unparsed, rejected, dropped):
+        for col, count in unparsed.items():
+            if count:
+                print(f"   - {file}: {count} '{col}' value(s) could not be converted and were set to NULL")
+        if rejected:
+            print(f"   - {file}: {rejected} row(s) with an unparseable key value written to "
+                  f"{rejects_table(summary[file]['table'])}")
+        if dropped:
+            print(f"   - {file}: {dropped} row(s) dropped for a missing key value")
+
+    def record(file, parse_time, result, load_time, resumed_rows=0):
+        entry = summary[file]
+        entry["elapsed"] = parse_time + load_time
+        if result is None:
+            print(f"Skipping empty file: {file}")
+            entry["status"] = "skipped (empty)"
         else:
-            print(f"Skipping {file}: Could not determine schema type based on columns.")
-            continue
-
-        constraints = inspector.get_unique_constraints(table_name, schema=schema)
-        constraint_names = [c['name'] for c in constraints]
-
-        with engine.begin() as conn:
-            if choice == "1":
-                if 'user_id' not in columns or 'data_fields' not in columns:
-                    print(f"Skipping {file}: Missing required columns for choice 1.")
-                    continue
-
-                constraint_name = f"{table_name}_user_data_key"
-                if constraint_name not in constraint_names:
-                    try:
-                        conn.execute(text(f"""
-                            ALTER TABLE {schema}.{table_name}
-                            ADD CONSTRAINT {constraint_name} UNIQUE (user_id, data_fields)
-                        """))
-                    except Exception as e:
-                        print(f"Warning: Could not add constraint. {e}")
-
-                # Inform user that the upsert process has started
-                print("Upserting data into the quiz table. Please wait...")
-
-                for _, row in df.iterrows():
-                    stmt = text(f"""
-                        INSERT INTO {schema}.{table_name} (user_id, data_fields, value)
-                        VALUES (:user_id, :data_fields, :value)
-                        ON CONFLICT (user_id, data_fields)
-                        DO UPDATE SET value = EXCLUDED.value
-                    """)
-                    conn.execute(stmt, {"user_id": row['user_id'], "data_fields": row['data_fields'], "value": row['value']})
-                print("** Data upserted successfully in quiz table")
-
-            elif choice == "2":
-                df = pd.read_csv(file_path, encoding="ISO-8859-1", sep=None, engine='python')
-                df.columns = df.columns.str.strip().str.replace('\ufeff', '')  # Normalize headers
-
-                if df.empty:
-                    print(f"** Skipping empty file: {file}")
-                    continue
-
-                required_cols = ["Email", "Session_Code", "Duration_in_hrs", "Duration_in_secs", "watched_on"]
-                if not all(col in df.columns for col in required_cols):
-                    print(f"** Skipping {file}: Missing required columns.")
+            entry["rows"], entry["inserted"], entry["updated"] = result
+            elapsed = max(entry["elapsed"], 1e-6)
+            # Staged rows neither inserted nor updated were unchanged (or repeated in the file)
+            unchanged = entry["rows"] - entry["inserted"] - entry["updated"]
+            print(f"   - {file}: {entry['rows']} rows staged, {entry['inserted']} inserted, "
+                  f"{entry['updated']} updated, {unchanged} unchanged in {elapsed:.2f}s "
+                  f"({entry['rows'] / elapsed:,.0f} rows/s)")
+            if resumed_rows:
+                print(f"   - {file}: plus {resumed_rows:,} rows loaded before the resume point")
+            # The ledger counts the whole file, including rows committed by the interrupted run
+            ledger(file, row_count=entry["rows"] + resumed_rows)
+
+    def fail(file, stage, error):
+        summary[file]["status"] = f"FAILED ({stage}: {error})"
+        ledger(file, status=STATUS_FAILED, error=f"{stage}: {error}")
+
+    if chunk_rows:
+        def stream(file, file_path, table_name, sheet_type, fmt):
+            with table_locks[table_name]:
+                start = time.time()
+                result, unparsed, rejected, dropped, resumed_rows = stream_sheet(engine, catalog, table_name,
+                                                                                 sheet_type, file_path, fmt,
+                                                                                 chunk_rows, summary[file]["sha256"],
+                                                                                 resume)
+                return result, unparsed, rejected, dropped, resumed_rows, time.time() - start
+
+        # Parsing happens block by block inside each loader thread
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as load_pool:
+            futures = {load_pool.submit(stream, *job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                file = futures[future]
+                try:
+                    result, unparsed, rejected, dropped, resumed_rows, load_time = future.result()
+                except Exception as e:
+                    fail(file, "load", e)
                     continue
-
-                # Replace 'NaN', nan, or empty with None before upsert
-                df['watched_on'] = df['watched_on'].replace(['NaN', 'nan', '', float('nan')], None)
-                df['Duration_in_hrs'] = df['Duration_in_hrs'].replace(['NaN', 'nan', '', float('nan')], None)
-                df['Duration_in_secs'] = df['Duration_in_secs'].replace(['NaN', 'nan', '', float('nan')], None)
-
-                with engine.begin() as conn:
-
-                    # Add unique constraint if not already present
-                    constraints = inspector.get_unique_constraints(table_name, schema=schema)
-                    constraint_names = [c['name'] for c in constraints]
-                    constraint_name = f"{table_name}_user_data_key"
-                    if constraint_name not in constraint_names:
-                        try:
-                            add_constraint_stmt = f"""
-                                ALTER TABLE {schema}."{table_name}"
-                                ADD CONSTRAINT {constraint_name} UNIQUE ("Email", "Session_Code")
-                            """
-                            conn.execute(text(add_constraint_stmt))
-                            print(f"Added UNIQUE constraint on (Email, Session_Code) to old.{table_name}")
-                        except Exception as e:
-                            print(f"** Warning: Could not add constraint. It might already exist. {e}")
-
-                    # Check and add 'watched_on' column if missing
-                    columns_in_db = [col["name"] for col in inspector.get_columns(table_name, schema=schema)]
-                    if "watched_on" not in columns_in_db:
-                        try:
-                            alter_column_stmt = f"""
-                                ALTER TABLE {schema}."{table_name}"
-                                ADD COLUMN "watched_on" TEXT
-                            """
-                            conn.execute(text(alter_column_stmt))
-                            print(f"## Added column 'watched_on' to old.{table_name}")
-                        except Exception as e:
-                            print(f"** Warning: Could not add 'watched_on' column. It might already exist or failed: {e}")
-
-                    # Inform user that the upsert process has started
-                    print("Upserting data into the session table. Please wait...")
-
-                    # Perform upsert
-                    for _, row in df.iterrows():
-                        watched_on_value = row['watched_on'] if pd.notna(row['watched_on']) else None
-
-                        stmt = text(f"""
-                            INSERT INTO {schema}."{table_name}" 
-                                ("Email", "Session_Code", "Duration_in_hrs", "Duration_in_secs", "watched_on")
-                            VALUES 
-                                (:Email, :Session_Code, :Duration_in_hrs, :Duration_in_secs, :watched_on)
-                            ON CONFLICT ("Email", "Session_Code")                                
-                            DO UPDATE SET
-                                "Duration_in_hrs" = EXCLUDED."Duration_in_hrs",
-                                "Duration_in_secs" = EXCLUDED."Duration_in_secs",
-                                "watched_on" = EXCLUDED."watched_on"
-                        """)
-                        conn.execute(stmt, {
-                            "Email": row['Email'],
-                            "Session_Code": row['Session_Code'],
-                            "Duration_in_hrs": row['Duration_in_hrs'],
-                            "Duration_in_secs": row['Duration_in_secs'],
-                            "watched_on": watched_on_value
-                        })
-
-                    print("** Data upserted successfully in session table")
-
-
-            elif choice == "3":
-                required_cols = ["assignment_id", "submitted_at", "Email"]
-                if not all(col in df.columns for col in required_cols):
-                    print(f"Skipping {file}: Missing required columns for choice 3.")
-                    continue
-
-                constraint_name = f"{table_name}_user_data_key"
-                if constraint_name not in constraint_names:
-                    try:
-                        conn.execute(text(f"""
-                            ALTER TABLE {schema}."{table_name}"
-                            ADD CONSTRAINT {constraint_name} UNIQUE ("assignment_id", "submitted_at", "Email")
-                        """))
-                    except Exception as e:
-                        print(f"Warning: Could not add constraint. {e}")
-
-                all_columns = df.columns.tolist()
-                insert_cols = ", ".join(f'"{col}"' for col in all_columns)
-                insert_vals = ", ".join(f":{col}" for col in all_columns)
-                update_cols = [col for col in all_columns if col not in ["assignment_id", "submitted_at", "Email"]]
-                update_stmt = ", ".join(f'"{col}" = EXCLUDED."{col}"' for col in update_cols)
-
-                 # Inform user that the upsert process has started
-                print("Upserting data into the assignment table. Please wait...")
-
-                for _, row in df.iterrows():
-                    stmt = text(f"""
-                        INSERT INTO {schema}."{table_name}" ({insert_cols})
-                        VALUES ({insert_vals})
-                        ON CONFLICT ("assignment_id", "submitted_at", "Email")
-                        DO UPDATE SET {update_stmt}
-                    """)
-                    conn.execute(stmt, {col: row[col] for col in all_columns})
-                print("** Data upserted successfully in assignment table")
+                report_coercion(file, unparsed, rejected, dropped)
+                record(file, 0.0, result, load_time, resumed_rows)
+        return [summary[f] for f in csv_files]
+
+    if workers <= 1:
+        for file, file_path, table_name, sheet_type, fmt in jobs:
+            try:
+                df, rejects, unparsed, dropped, parse_time = parse_sheet(file_path, sheet_type, fmt,
+                                                                         coerced_columns(catalog, table_name,
+                                                                                         sheet_type))
+            except Exception as e:
+                fail(file, "parse", e)
+                continue
+            report_coercion(file, unparsed, len(rejects), dropped)
+            try:
+                result, load_time = (load(file, table_name, sheet_type, df, rejects)
+                                     if not (df.empty and rejects.empty) else (None, 0.0))
+            except Exception as e:
+                fail(file, "load", e)
+                raise
+            record(file, parse_time, result, load_time)
+        return [summary[f] for f in csv_files]
+
+    # Spawned workers re-import this module, which is safe (no DB work at import)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as parse_pool, \
+            ThreadPoolExecutor(max_workers=workers) as load_pool:
+        parse_futures = {parse_pool.submit(parse_sheet, file_path, sheet_type, fmt,
+                                           coerced_columns(catalog, table_name, sheet_type)): (file, table_name, sheet_type)
+                         for file, file_path, table_name, sheet_type, fmt in jobs}
+        load_futures = {}
+        for future in as_completed(parse_futures):
+            file, table_name, sheet_type = parse_futures[future]
+            try:
+                df, rejects, unparsed, dropped, parse_time = future.result()
+            except Exception as e:
+                fail(file, "parse", e)
+                continue
+            report_coercion(file, unparsed, len(rejects), dropped)
+            if df.empty and rejects.empty:
+                record(file, parse_time, None, 0.0)
+                continue
+            load_futures[load_pool.submit(load, file, table_name, sheet_type, df, rejects)] = (file, parse_time)
+
+        for future in as_completed(load_futures):
+            file, parse_time = load_futures[future]
+            try:
+                result, load_time = future.result()
+            except Exception as e:
+                fail(file, "load", e)
+                continue
+            record(file, parse_time, result, load_time)
+
+    return [summary[f] for f in csv_files]
+
+
+def print_summary(results):
+    print(f"\n{'file':<40} {'rows':>8} {'inserted':>8} {'updated':>8} {'seconds':>8}  status")
+    for r in results:
+        print(f"{r['file'][:40]:<40} {r['rows']:>8} {r['inserted']:>8} {r['updated']:>8} {r['elapsed']:>8.2f}  {r['status']}")
+    failed = sum(r["status"].startswith("FAILED") for r in results)
+    print(f"\n{sum(r['status'] == 'ok' for r in results)} file(s) loaded, {failed} failed.")
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python3 load_monitoring_csvs_to_db.py <folder_path>")
-        sys.exit(1)
-
-    folder_path = sys.argv[1]
-
-    filter_text= ""
-
-    engine = get_engine()
-    import_csv_to_db(folder_path, engine, filter_text)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Upsert monitoring CSV exports into old.<table> tables")
+    parser.add_argument("folder_path", help="Folder containing the quiz / session / assignment CSVs")
+    parser.add_argument("--filter", default="", dest="filter_text",
+                        help="Only load files whose name contains this text")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Files parsed and loaded in parallel (default: 1; capped by the bulk_load pool)")
+    parser.add_argument("--force", action="store_true",
+                        help="Reload files already recorded as loaded in meta.ingest_ledger")
+    parser.add_argument("--chunk-rows", type=int, nargs="?", const=DEFAULT_CHUNK_ROWS, default=0,
+                        help=f"Stream each file in blocks of N rows with progress/ETA and a committed "
+                             f"checkpoint per block (default N: {DEFAULT_CHUNK_ROWS})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue interrupted files from their last checkpoint (implies --chunk-rows)")
+    add_env_argument(parser)
+    args = parser.parse_args()
+
+    chunk_rows = args.chunk_rows or (DEFAULT_CHUNK_ROWS if args.resume else 0)
+    engine = get_engine("bulk_load")
+    results = import_csv_to_db(args.folder_path, engine, args.filter_text, args.workers, args.force, chunk_rows,
+                               args.resume)
+    print_summary(results)
+    print(pool_status("bulk_load"))
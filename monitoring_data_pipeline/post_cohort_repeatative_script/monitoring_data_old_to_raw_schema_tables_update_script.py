@@ -1,38 +1,108 @@
+import argparse
 import os
 import sys
 import pandas as pd
+from functools import partial
 from sqlalchemy import text
 import time
 
-from deployment_scripts.connection import get_engine, get_session, metadata
+from deployment_scripts.bulk_load import run_counted_upsert
+from deployment_scripts.catalog_cache import CatalogCache
+from deployment_scripts.connection import (add_env_argument, clamp_workers, get_engine, get_session, lift_statement_timeout,
+                                           metadata, pool_status)
+from deployment_scripts.ingest_ledger import (
+    INGESTED_AT_COLUMN,
+    SAFE_WATERMARK_QUERY,
+    ensure_ingested_at,
+    ensure_ledger,
+    ensure_rejects_table,
+    get_watermark,
+    rejects_table,
+    save_watermark,
+)
+from deployment_scripts.resource_alias import ensure_resource_alias, sync_title_aliases, unresolved_titles
+from deployment_scripts.task_graph import (
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_SKIPPED,
+    Task,
+    print_task_report,
+    run_task_graph,
+)
 
-engine = get_engine()
+# These queries read typed old.* columns (INTEGER / NUMERIC / DATE / TIMESTAMP).
+# Run database_and_schema_manipulation_script.retype_old_monitoring_columns once
+# on databases created before the loader started coercing types at ingest.
+#
+# The monitoring queries only select old.* rows whose ingested_at is at or
+# after :since (NULL = every row). :since is the task's watermark from
+# meta.propagation_watermark, saved in the same transaction as its upsert.
+# Each candidates CTE keeps one row per conflict key, the most recently
+# ingested: ON CONFLICT DO UPDATE fails if one statement proposes the same
+# key twice (e.g. two aliases of a title, or emails differing only in case).
+
+# Emails are matched on the generated, indexed email_key column (lower(btrim(email))).
+# Run database_and_schema_manipulation_script.add_email_key_columns once to add it.
+# raw.student_details is reduced to one row per email_key (the latest id), so
+# students whose emails differ only in case do not fan out the joins.
+#
+# Session rows are split by the session_kind column set at ingest from the
+# Session_Code prefix (csv_reader.SESSION_KIND_PREFIXES), each kind with its own
+# partial index. Run database_and_schema_manipulation_script.add_session_kind_column
+# once, and again after adding a prefix.
+
+# Quiz, assignment and video titles resolve to resources through raw.resource_alias,
+# keyed by (category, normalized title). Current resource titles are synced into
+# it on every run; earlier titles and manual aliases stay, so renames keep matching.
+
+# Rows that would abort or be silently dropped by an upsert, per old.* source
+# table, as (reason, condition). Before the upsert they are copied to
+# old.<source>_rejects, and the upsert itself skips them.
+REJECT_RULES = {
+    "assignment_monitoring_data": [
+        ("invalid submission_status",
+         "submission_status IS NOT NULL AND submission_status NOT IN "
+         "(SELECT enumlabel::TEXT FROM pg_enum WHERE enumtypid = 'raw.submission_status_enum'::regtype)"),
+        ("missing submitted_at", "submitted_at IS NULL"),
+        ("submitted_at in the future", "submitted_at > now() + INTERVAL '1 day'"),
+    ],
+}
+
+
+def invalid_condition(source):
+    """SQL condition that is TRUE for rows of old.<source> breaking any reject rule."""
+    return " OR ".join(f"COALESCE({condition}, FALSE)" for _, condition in REJECT_RULES[source])
 
 
 # Query to insert Incubator student assignments
 
-student_assignment_query = text("""
+student_assignment_query = text(f"""
     WITH raw_student_cohort_data AS (
         SELECT student_id, cohort_code
         FROM raw.student_cohort
     ),
     student_details_data AS (
-        SELECT id,email FROM raw.student_details
+        SELECT DISTINCT ON (email_key) id, email_key
+        FROM raw.student_details
+        ORDER BY email_key, id DESC
     ),
     assignment_data AS (
         SELECT
-            "assignment_name" AS name,
-            "Email" AS email,
+            raw.normalize_title("assignment_name") AS name_key,
+            email_key,
             "student_name" AS student_name,
             "submission_status" AS submission_status,
             "feedback_comments" AS feedback,
             "submitted_at" AS submitted_at,
-            "assignment_file" AS assignment_file
+            "assignment_file" AS assignment_file,
+            ingested_at
         FROM old.assignment_monitoring_data
+        WHERE ingested_at >= COALESCE(CAST(:since AS TIMESTAMPTZ), '-infinity')
+          AND NOT ({invalid_condition("assignment_monitoring_data")})
     ),
     resource_data AS (
-        SELECT id AS resource_id, title
-        FROM raw.resource
+        SELECT resource_id, alias_key
+        FROM raw.resource_alias
         WHERE category = 'Assignment'
     ),
     student_assignment_data AS (
@@ -49,33 +119,59 @@ student_assignment_query = text("""
                 ELSE 0
             END)::DECIMAL AS marks_pct,
             a.feedback AS feedback_comments,
-            NULLIF(TRIM(a.submitted_at), '')::timestamp AS submitted_at,
-            a.assignment_file AS assignment_file
+            a.submitted_at AS submitted_at,
+            a.assignment_file AS assignment_file,
+            a.ingested_at
         FROM assignment_data a
-        INNER JOIN student_details_data sd ON a.email = sd.email                    
+        INNER JOIN student_details_data sd ON a.email_key = sd.email_key                    
         INNER JOIN raw_student_cohort_data sc ON sd.id = sc.student_id
-        INNER JOIN resource_data r ON a.name = r.title
-        WHERE TRIM(a.submitted_at) IS NOT NULL
-            AND TRIM(a.submitted_at) <> ''
-            AND TRIM(a.submitted_at) <> 'NaN'
-    )
-    INSERT INTO raw.student_assignment (
-        student_id, resource_id, mentor_id, cohort_code, submission_status,
-        marks_pct, feedback_comments, submitted_at, assignment_file
+        INNER JOIN resource_data r ON a.name_key = r.alias_key
+        WHERE a.submitted_at IS NOT NULL
+    ),
+    candidates AS (
+        SELECT DISTINCT ON (student_id, resource_id, submitted_at)
+            student_id, resource_id, mentor_id, cohort_code, submission_status,
+            marks_pct, feedback_comments, submitted_at, assignment_file
+        FROM student_assignment_data
+        ORDER BY student_id, resource_id, submitted_at, ingested_at DESC
+    ),
+    upserted AS (
+        INSERT INTO raw.student_assignment AS t (
+            student_id,
+            resource_id,
+            mentor_id,
+            cohort_code,
+            submission_status,
+            marks_pct,
+            feedback_comments,
+            submitted_at,
+            assignment_file
+        )
+        SELECT * FROM candidates
+        ON CONFLICT (student_id, resource_id, submitted_at)
+        DO UPDATE SET
+            mentor_id = EXCLUDED.mentor_id,
+            cohort_code = EXCLUDED.cohort_code,
+            submission_status = EXCLUDED.submission_status,
+            marks_pct = EXCLUDED.marks_pct,
+            feedback_comments = EXCLUDED.feedback_comments,
+            submitted_at = EXCLUDED.submitted_at,
+            assignment_file = EXCLUDED.assignment_file
+        WHERE (
+            t.mentor_id, t.cohort_code, t.submission_status, t.marks_pct,
+            t.feedback_comments, t.submitted_at, t.assignment_file
+        ) IS DISTINCT FROM (
+            EXCLUDED.mentor_id, EXCLUDED.cohort_code, EXCLUDED.submission_status,
+            EXCLUDED.marks_pct, EXCLUDED.feedback_comments, EXCLUDED.submitted_at,
+            EXCLUDED.assignment_file
+        )
+        RETURNING (xmax = 0) AS inserted
     )
-    SELECT 
-        student_id, resource_id, mentor_id, cohort_code, submission_status,
-        marks_pct, feedback_comments, submitted_at, assignment_file
-    FROM student_assignment_data
-    ON CONFLICT (student_id, resource_id, submitted_at)
-    DO UPDATE SET
-        mentor_id = EXCLUDED.mentor_id,
-        cohort_code = EXCLUDED.cohort_code,
-        submission_status = EXCLUDED.submission_status,
-        marks_pct = EXCLUDED.marks_pct,
-        feedback_comments = EXCLUDED.feedback_comments,
-        submitted_at = EXCLUDED.submitted_at,
-        assignment_file = EXCLUDED.assignment_file;
+    SELECT
+        (SELECT COUNT(*) FROM candidates) AS candidates,
+        COUNT(*) FILTER (WHERE inserted) AS inserted,
+        COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM upserted;
 """)
 
 
@@ -85,7 +181,9 @@ student_session_query = text("""
         FROM raw.student_cohort
     ),
     student_details_data AS (
-        SELECT id,email FROM raw.student_details
+        SELECT DISTINCT ON (email_key) id, email_key
+        FROM raw.student_details
+        ORDER BY email_key, id DESC
     ),
     session_data AS (
         SELECT id AS session_id, session_name, cohort_code, code
@@ -93,34 +191,53 @@ student_session_query = text("""
     ),
     raw_student_session_info AS (
         SELECT
-            "Email" AS email,
+            email_key,
             "Session_Code" AS session_code,
             "Duration_in_secs" AS duration_in_sec,
-            "watched_on" AS watched_on
+            "watched_on" AS watched_on,
+            ingested_at
         FROM old.student_session_information
-        WHERE "Session_Code" LIKE 'SUK%' 
-           OR "Session_Code" LIKE 'WS%'      
-           OR "Session_Code" LIKE 'MC%'
+        WHERE session_kind = 'live'
+          AND ingested_at >= COALESCE(CAST(:since AS TIMESTAMPTZ), '-infinity')
     ),
     student_live_session_cte AS (
         SELECT
             sd.id::INT AS student_id,
             s.session_id::INT AS session_id,
-            ssi.duration_in_sec::INT AS duration_in_sec,
-            ssi.watched_on::DATE AS watched_on
+            ssi.duration_in_sec AS duration_in_sec,
+            ssi.watched_on AS watched_on,
+            ssi.ingested_at
         FROM raw_student_session_info ssi
-        INNER JOIN student_details_data sd ON ssi.email = sd.email                    
+        INNER JOIN student_details_data sd ON ssi.email_key = sd.email_key                    
         INNER JOIN raw_student_cohort_data sc ON sd.id = sc.student_id
         INNER JOIN session_data s ON ssi.session_code = s.code AND sc.cohort_code = s.cohort_code
+    ),
+    candidates AS (
+        SELECT DISTINCT ON (student_id, session_id)
+            student_id, session_id, duration_in_sec, watched_on
+        FROM student_live_session_cte
+        ORDER BY student_id, session_id, ingested_at DESC
+    ),
+    upserted AS (
+        INSERT INTO raw.student_session AS t (
+            student_id,
+            session_id,
+            duration_in_sec,
+            watched_on
+        )
+        SELECT * FROM candidates
+        ON CONFLICT (student_id, session_id)
+        DO UPDATE SET
+            duration_in_sec = EXCLUDED.duration_in_sec,
+            watched_on = EXCLUDED.watched_on
+        WHERE (t.duration_in_sec, t.watched_on) IS DISTINCT FROM (EXCLUDED.duration_in_sec, EXCLUDED.watched_on)
+        RETURNING (xmax = 0) AS inserted
     )
-    INSERT INTO raw.student_session (
-        student_id, session_id, duration_in_sec, watched_on
-    )
-    SELECT * FROM student_live_session_cte
-    ON CONFLICT (student_id, session_id)
-    DO UPDATE SET
-        duration_in_sec = EXCLUDED.duration_in_sec,
-        watched_on = EXCLUDED.watched_on;
+    SELECT
+        (SELECT COUNT(*) FROM candidates) AS candidates,
+        COUNT(*) FILTER (WHERE inserted) AS inserted,
+        COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM upserted;
 """)
 
 student_quiz_query = text("""
@@ -130,18 +247,22 @@ student_quiz_query = text("""
     ),
     quiz_data AS (
         SELECT
-            "user_id" AS email,
-            "data_fields" AS quiz_name,
-            "value" AS obtained_marks
+            email_key,
+            raw.normalize_title("data_fields") AS quiz_key,
+            "value" AS obtained_marks,
+            ingested_at
         FROM old.incubator_quiz_monitoring
+        WHERE ingested_at >= COALESCE(CAST(:since AS TIMESTAMPTZ), '-infinity')
     ),
                           
     student_details_data AS (
-        SELECT id,email FROM raw.student_details
+        SELECT DISTINCT ON (email_key) id, email_key
+        FROM raw.student_details
+        ORDER BY email_key, id DESC
     ),
     resource_data AS (
-        SELECT id AS resource_id, title
-        FROM raw.resource
+        SELECT resource_id, alias_key
+        FROM raw.resource_alias
         WHERE category = 'Quiz'
     ),
     student_quiz_data AS (
@@ -150,25 +271,51 @@ student_quiz_query = text("""
             r.resource_id::INT AS resource_id,
             sc.cohort_code AS cohort_code,
             100::INT AS max_marks,
-            q.obtained_marks::INT AS marks,
+            q.obtained_marks AS marks,
             NULL::INT AS reattempts,
-            NULL::TIMESTAMP AS attempted_at
+            NULL::TIMESTAMP AS attempted_at,
+            q.ingested_at
         FROM quiz_data q
-        INNER JOIN student_details_data sd ON q.email = sd.email                    
+        INNER JOIN student_details_data sd ON q.email_key = sd.email_key                    
         INNER JOIN raw_student_cohort_data sc ON sd.id = sc.student_id
-        INNER JOIN resource_data r ON q.quiz_name = r.title
-    )
-    INSERT INTO raw.student_quiz (
-        student_id, resource_id, cohort_code, max_marks, marks, reattempts, attempted_at
+        INNER JOIN resource_data r ON q.quiz_key = r.alias_key
+    ),
+    candidates AS (
+        SELECT DISTINCT ON (student_id, resource_id)
+            student_id, resource_id, cohort_code, max_marks, marks, reattempts, attempted_at
+        FROM student_quiz_data
+        ORDER BY student_id, resource_id, ingested_at DESC
+    ),
+    upserted AS (
+        INSERT INTO raw.student_quiz AS t (
+            student_id,
+            resource_id,
+            cohort_code,
+            max_marks,
+            marks,
+            reattempts,
+            attempted_at
+        )
+        SELECT * FROM candidates
+        ON CONFLICT (student_id, resource_id)
+        DO UPDATE SET
+            cohort_code = EXCLUDED.cohort_code,
+            max_marks = EXCLUDED.max_marks,
+            marks = EXCLUDED.marks,
+            reattempts = EXCLUDED.reattempts,
+            attempted_at = EXCLUDED.attempted_at
+        WHERE (
+            t.cohort_code, t.max_marks, t.marks, t.reattempts, t.attempted_at
+        ) IS DISTINCT FROM (
+            EXCLUDED.cohort_code, EXCLUDED.max_marks, EXCLUDED.marks, EXCLUDED.reattempts, EXCLUDED.attempted_at
+        )
+        RETURNING (xmax = 0) AS inserted
     )
-    SELECT * FROM student_quiz_data
-    ON CONFLICT (student_id, resource_id)
-    DO UPDATE SET
-        cohort_code = EXCLUDED.cohort_code,
-        max_marks = EXCLUDED.max_marks,
-        marks = EXCLUDED.marks,
-        reattempts = EXCLUDED.reattempts,
-        attempted_at = EXCLUDED.attempted_at;
+    SELECT
+        (SELECT COUNT(*) FROM candidates) AS candidates,
+        COUNT(*) FILTER (WHERE inserted) AS inserted,
+        COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM upserted;
 """)
 
 student_pre_recorded_query = text("""
@@ -177,42 +324,66 @@ student_pre_recorded_query = text("""
         FROM raw.student_cohort
     ),
     student_details_data AS (
-        SELECT id,email FROM raw.student_details
+        SELECT DISTINCT ON (email_key) id, email_key
+        FROM raw.student_details
+        ORDER BY email_key, id DESC
     ),
     resource_data AS (
-        SELECT id AS resource_id, title, total_duration AS watchtime_in_min
-        FROM raw.resource
+        SELECT resource_id, alias_key
+        FROM raw.resource_alias
+        WHERE category = 'Pre-recorded Video'
     ),
     raw_student_session_info AS (
         SELECT
-            "Email" AS email,
-            "Session_Code" AS session_code,
+            email_key,
+            raw.normalize_title("Session_Code") AS session_key,
             "Duration_in_secs" AS watchtime_in_secs,
-            "watched_on" AS watched_on
+            "watched_on" AS watched_on,
+            ingested_at
         FROM old.student_session_information
-        WHERE "Session_Code" LIKE 'VID%' 
-           
+        WHERE session_kind = 'pre_recorded'
+          AND ingested_at >= COALESCE(CAST(:since AS TIMESTAMPTZ), '-infinity')
     ),
     student_pre_recorded_cte AS (
         SELECT
             sd.id::INT AS student_id,
             r.resource_id::INT AS resource_id,
             sc.cohort_code AS cohort_code,
-            ssi.watchtime_in_secs::INT AS watchtime_in_sec,
-            ssi.watched_on::DATE AS watched_at
+            ssi.watchtime_in_secs AS watchtime_in_sec,
+            ssi.watched_on AS watched_at,
+            ssi.ingested_at
         FROM raw_student_session_info ssi
-        INNER JOIN student_details_data sd ON ssi.email = sd.email                    
+        INNER JOIN student_details_data sd ON ssi.email_key = sd.email_key                    
         INNER JOIN raw_student_cohort_data sc ON sd.id = sc.student_id
-        INNER JOIN resource_data r ON ssi.session_code = r.title
-    )
-    INSERT INTO raw.student_pre_recorded (
-        student_id, resource_id, cohort_code, watchtime_in_sec, watched_at
+        INNER JOIN resource_data r ON ssi.session_key = r.alias_key
+    ),
+    candidates AS (
+        SELECT DISTINCT ON (student_id, resource_id)
+            student_id, resource_id, cohort_code, watchtime_in_sec, watched_at
+        FROM student_pre_recorded_cte
+        ORDER BY student_id, resource_id, ingested_at DESC
+    ),
+    upserted AS (
+        INSERT INTO raw.student_pre_recorded AS t (
+            student_id,
+            resource_id,
+            cohort_code,
+            watchtime_in_sec,
+            watched_at
+        )
+        SELECT * FROM candidates
+        ON CONFLICT (student_id, resource_id)
+        DO UPDATE SET
+            watchtime_in_sec = EXCLUDED.watchtime_in_sec,
+            watched_at = EXCLUDED.watched_at
+        WHERE (t.watchtime_in_sec, t.watched_at) IS DISTINCT FROM (EXCLUDED.watchtime_in_sec, EXCLUDED.watched_at)
+        RETURNING (xmax = 0) AS inserted
     )
-    SELECT * FROM student_pre_recorded_cte
-    ON CONFLICT (student_id, resource_id)
-    DO UPDATE SET                          
-        watchtime_in_sec = EXCLUDED.watchtime_in_sec,
-        watched_at = EXCLUDED.watched_at;
+    SELECT
+        (SELECT COUNT(*) FROM candidates) AS candidates,
+        COUNT(*) FILTER (WHERE inserted) AS inserted,
+        COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM upserted;
 """)
 
 student_cohort_query = text("""
@@ -259,68 +430,236 @@ student_cohort_query = text("""
             ON sd.student_id = sc.student_id
         INNER JOIN cohort_data c
             ON sc.cohort_code = c.cohort_code
+    ),
+    candidates AS (
+        SELECT 
+            student_code,
+            student_id,
+            cohort_code,
+            is_leader,
+            cohort_enroll_date 
+        FROM student_cohort_data
+    ),
+    upserted AS (
+        INSERT INTO raw.student_cohort AS t (
+            student_code,
+            student_id,
+            cohort_code,
+            is_leader,
+            cohort_enroll_date
+        )
+        SELECT * FROM candidates
+        ON CONFLICT (student_code, student_id)
+        DO UPDATE SET
+            cohort_code = EXCLUDED.cohort_code,
+            is_leader = EXCLUDED.is_leader,
+            cohort_enroll_date = EXCLUDED.cohort_enroll_date
+        WHERE (
+            t.cohort_code, t.is_leader, t.cohort_enroll_date
+        ) IS DISTINCT FROM (
+            EXCLUDED.cohort_code, EXCLUDED.is_leader, EXCLUDED.cohort_enroll_date
+        )
+        RETURNING (xmax = 0) AS inserted
     )
-
-    INSERT INTO raw.student_cohort (
-        student_code, 
-        student_id, 
-        cohort_code, 
-        is_leader, 
-        cohort_enroll_date
-    )
-    SELECT 
-        student_code,
-        student_id,
-        cohort_code,
-        is_leader,
-        cohort_enroll_date 
-    FROM student_cohort_data
-
-    ON CONFLICT (student_code, student_id)
-    DO UPDATE SET
-        cohort_code = EXCLUDED.cohort_code,
-        is_leader = EXCLUDED.is_leader,
-        cohort_enroll_date = EXCLUDED.cohort_enroll_date;
+    SELECT
+        (SELECT COUNT(*) FROM candidates) AS candidates,
+        COUNT(*) FILTER (WHERE inserted) AS inserted,
+        COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM upserted;
 """)
 
 
 
+# Tasks and the tasks they must wait for. The four monitoring upserts write
+# disjoint raw.* tables and only read shared dimensions, so they run
+# concurrently; with --with-cohort they all wait for raw.student_cohort.
+QUERY_TASKS = [
+    ("student_assignment", student_assignment_query),
+    ("student_session", student_session_query),
+    ("student_pre_recorded", student_pre_recorded_query),
+    ("student_quiz", student_quiz_query),
+]
+COHORT_TASK = ("student_cohort", student_cohort_query)
+
+# Alias category each task resolves titles through (see resource_alias.TITLE_SOURCES).
+# Checked before the upsert so titles that match no alias are reported instead of
+# silently dropped.
+TITLE_LOOKUPS = {
+    "student_assignment": "Assignment",
+    "student_pre_recorded": "Pre-recorded Video",
+    "student_quiz": "Quiz",
+}
+
+# old.* table read by each incremental task
+WATERMARK_SOURCES = {
+    "student_assignment": "assignment_monitoring_data",
+    "student_session": "student_session_information",
+    "student_pre_recorded": "student_session_information",
+    "student_quiz": "incubator_quiz_monitoring",
+}
+
+
+def prepare_sources(ddl_engine):
+    """Create the meta, rejects and alias tables, sync resource titles, and add ingested_at where missing."""
+    catalog = CatalogCache(ddl_engine)
+    catalog.prefetch("old", set(WATERMARK_SOURCES.values()))
+    with ddl_engine.begin() as conn:
+        # Adding ingested_at and its index scans the large old.* tables
+        lift_statement_timeout(conn)
+        ensure_ledger(conn)
+        for table_name in sorted(set(WATERMARK_SOURCES.values())):
+            if catalog.exists("old", table_name) and INGESTED_AT_COLUMN not in catalog.columns("old", table_name):
+                ensure_ingested_at(conn, "old", table_name)
+                print(f"## Added column '{INGESTED_AT_COLUMN}' to old.{table_name}")
+        ensure_resource_alias(conn)
+        synced = sync_title_aliases(conn)
+        if synced:
+            print(f"* {synced} resource title(s) added to raw.resource_alias")
+        for source in REJECT_RULES:
+            ensure_rejects_table(conn, source)
+
+
+def quarantine_rejects(conn, source, since):
+    """Copy rows of old.<source> ingested since `since` that break a reject rule to its rejects table.
+
+    One set-based statement; returns the number of rows quarantined.
+    """
+    reasons = ", ".join(f"CASE WHEN COALESCE({condition}, FALSE) THEN '{reason}' END"
+                        for reason, condition in REJECT_RULES[source])
+    result = conn.execute(text(f"""
+        WITH rejected AS (
+            SELECT
+                to_jsonb(s) - '{INGESTED_AT_COLUMN}' AS row_data,
+                array_to_string(ARRAY[{reasons}], '; ') AS reasons
+            FROM old."{source}" s
+            WHERE ingested_at >= COALESCE(CAST(:since AS TIMESTAMPTZ), '-infinity')
+              AND ({invalid_condition(source)})
+        )
+        INSERT INTO {rejects_table(source)} (row_key, reasons, row_data)
+        SELECT DISTINCT ON (md5(row_data::TEXT)) md5(row_data::TEXT), reasons, row_data
+        FROM rejected
+        ON CONFLICT (row_key) DO UPDATE SET
+            reasons = EXCLUDED.reasons,
+            rejected_at = now()
+    """), {"since": since})
+    return result.rowcount
+
+
+def run_query(engine, table_name, query, full=False):
+    """Run one upsert in its own pooled connection and transaction.
+
+    Monitoring tasks read only rows ingested since their watermark (all rows
+    with `full`) and advance it when they commit. Rows breaking a reject rule
+    are quarantined first, so one bad value cannot abort the upsert.
+    """
+    with engine.begin() as conn:
+        if table_name not in WATERMARK_SOURCES:
+            inserted, updated, unchanged = run_counted_upsert(conn, query)
+            since, rejected, unresolved = None, 0, []
+        else:
+            task = f"raw.{table_name}"
+            since = None if full else get_watermark(conn, task)
+            upper = conn.execute(SAFE_WATERMARK_QUERY).scalar()
+            source = WATERMARK_SOURCES[table_name]
+            rejected = quarantine_rejects(conn, source, since) if source in REJECT_RULES else 0
+            unresolved = []
+            if table_name in TITLE_LOOKUPS:
+                unresolved = unresolved_titles(
+                    conn, TITLE_LOOKUPS[table_name],
+                    "ingested_at >= COALESCE(CAST(:since AS TIMESTAMPTZ), '-infinity')",
+                    {"since": since},
+                )
+            inserted, updated, unchanged = run_counted_upsert(conn, query, {"since": since})
+            save_watermark(conn, task, upper, inserted + updated)
+    print(f"* Data returned to '{table_name}' table.")
+    print(f"   - Rows inserted: {inserted}, updated: {updated}, unchanged: {unchanged}"
+          + (f" (rows ingested since {since:%Y-%m-%d %H:%M:%S})" if since else " (full)"))
+    if rejected:
+        print(f"   - {rejected} row(s) quarantined in {rejects_table(source)}")
+    if unresolved:
+        print(f"   - {sum(rows for _, rows in unresolved)} row(s) with {len(unresolved)} unresolved title(s)")
+    return inserted + updated, unresolved
+
+
+def print_unresolved_summary(results, limit=10):
+    """List the titles that matched no raw.resource_alias entry, per task."""
+    unresolved = {name: r.value[1] for name, r in results.items()
+                  if r.status == STATUS_DONE and r.value and r.value[1]}
+    if not unresolved:
+        return
+    print("\nUnresolved resource titles (add them with add_resource_aliases):")
+    for name, titles in unresolved.items():
+        print(f"* {name}: {len(titles)} title(s)")
+        for title, rows in titles[:limit]:
+            print(f"   - {title!r}: {rows} row(s)")
+        if len(titles) > limit:
+            print(f"   - ... and {len(titles) - limit} more")
+
+
+def build_tasks(engine, with_cohort=False, full=False):
+    """One task per upsert; with `with_cohort`, the others wait for raw.student_cohort.
+
+    When the cohort refresh inserts or changes rows, the dependent tasks run
+    in full: old.* rows of newly enrolled students were dropped by the cohort
+    join on earlier runs and are already behind the watermark.
+    """
+    deps = ()
+    tasks = []
+    cohort_changes = {}
+    if with_cohort:
+        cohort_table, cohort_query = COHORT_TASK
+
+        def refresh_cohort():
+            result = run_query(engine, cohort_table, cohort_query)
+            cohort_changes["rows"] = result[0]
+            return result
+
+        tasks.append(Task(cohort_table, refresh_cohort, ()))
+        deps = (cohort_table,)
+
+    def run_dependent(table_name, query):
+        task_full = full or cohort_changes.get("rows", 0) > 0
+        if task_full and not full:
+            print(f"** raw.student_cohort changed; reprocessing every old.* row for '{table_name}'")
+        return run_query(engine, table_name, query, task_full)
+
+    for table_name, query in QUERY_TASKS:
+        tasks.append(Task(table_name, partial(run_dependent, table_name, query), deps))
+    return tasks
+
+
 # Execute queries
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upsert old.* monitoring data into raw.* tables")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Queries run at the same time (default 4, the bulk_load pool size)")
+    parser.add_argument("--with-cohort", action="store_true",
+                        help="Refresh raw.student_cohort first; the other queries wait for it")
+    parser.add_argument("--full", action="store_true",
+                        help="Reprocess every old.* row instead of only rows ingested since the last run")
+    add_env_argument(parser)
+    args = parser.parse_args()
 
-    start_time = time.time()
+    start_time = time.perf_counter()
+    engine = get_engine("bulk_load")
 
     print("Execution started...\n")
 
-    query_tasks = [
-        ("student_assignment", student_assignment_query),
-        ("student_session", student_session_query),
-        ("student_pre_recorded", student_pre_recorded_query),
-        ("student_quiz", student_quiz_query)
-    ]
-
-    for table_name, query in query_tasks:
-        try:
-            with engine.begin() as conn:
-                result = conn.execute(query)
-                print(f"* Data returned to '{table_name}' table.")
-                print(f"   - Rows inserted/updated: {result.rowcount}\n")
-        except Exception as e:
-            print(f"! Failed to insert into '{table_name}': {e}\n")
-
-    '''
-    try:
-        with engine.begin() as conn:
-            student_cohort_result = conn.execute(student_cohort_query)
-            print("* Data returned to 'student_cohort' table.")
-            print(f"   - Rows inserted/updated: {student_cohort_result.rowcount}")
-    except Exception as e:
-        print(f"! Failed to insert into 'student_cohort': {e}")
-    '''
-
-    end_time = time.time()
-    total_runtime = end_time - start_time
-
-    print("Execution completed.")
-    print(f"Total runtime: {total_runtime:.2f} seconds")
\ No newline at end of file
+    prepare_sources(get_engine("ddl"))
+    tasks = build_tasks(engine, with_cohort=args.with_cohort, full=args.full)
+    results = run_task_graph(tasks, max_workers=clamp_workers(args.workers, "bulk_load"))
+
+    for result in results.values():
+        if result.status == STATUS_FAILED:
+            print(f"! Failed to insert into '{result.name}': {result.error}")
+        elif result.status == STATUS_SKIPPED:
+            print(f"! Skipped '{result.name}': a prerequisite failed")
+
+    print_unresolved_summary(results)
+    total_runtime = time.perf_counter() - start_time
+
+    print("\nExecution completed.")
+    print_task_report(tasks, results, total_runtime)
+    print(f"Total runtime: {total_runtime:.2f} seconds")
+    print(pool_status("bulk_load"))
@@ -4,11 +4,9 @@ import pandas as pd
 from sqlalchemy import text
 import textwrap
 
+from deployment_scripts.bulk_load import run_counted_upsert
 from deployment_scripts.connection import get_engine, get_session, metadata
 
-# SQLAlchemy engine
-engine = get_engine()
-
 # -------------------------------
 # Function to handle duplicates, CSV export, and unique constraint
 # -------------------------------
@@ -20,6 +18,7 @@ def prepare_table_for_upsert(table_name, unique_columns, csv_filename):
     GROUP BY {', '.join(unique_columns)}
     HAVING COUNT(*) > 1;
     """
+    engine = get_engine("bulk_load")
     with engine.begin() as conn:
         dup_df = pd.read_sql(dup_query, conn)
         if not dup_df.empty:
@@ -48,6 +47,7 @@ def clean_general_information_sheet():
     GROUP BY "Email"
     HAVING COUNT(*) > 1;
     """
+    engine = get_engine("bulk_load")
     with engine.begin() as conn:
         dup_df = pd.read_sql(dup_query, conn)
         if not dup_df.empty:
@@ -66,9 +66,8 @@ def clean_general_information_sheet():
             print("* No duplicates found in raw.general_information_sheet.")
 
 # -------------------------------
-# Prepare tables for upsert
+# Prepare tables for upsert (run from __main__)
 # -------------------------------
-clean_general_information_sheet()
 #prepare_table_for_upsert("final.final_quiz", ["student_id", "resource_id"], "duplicate_final_quiz.csv")
 #prepare_table_for_upsert("final.final_assignment", ["student_id", "resource_id", "submitted_at"], "duplicate_final_assignment.csv")
 #prepare_table_for_upsert("final.daily_weekly_attendance",["student_id", "session_id"],"duplicate_daily_weekly_student_attendance.csv")
@@ -90,59 +89,80 @@ WITH submission_counts AS (
     MAX(submitted_at) FILTER (WHERE submission_status = 'under review') AS last_submission_date
   FROM intermediate.final_assignment
   GROUP BY student_id, resource_id, title, cohort_code, college_name
-)
-INSERT INTO final.resubmission_count_overview (
-    student_id,
-    email_id,
-    resource_id,
-    title,
-    cohort_code,
-    college_name,
-    total_submissions,
-    resubmissions_count,
-    resubmission_rate,
-    accepted_count,
-    acceptance_rate,
-    rejected_count,
-    rejection_rate,                                                                                                             
-    last_submission_date
+),
+candidates AS (
+    SELECT
+      sc.student_id,
+      sd.email AS email_id,
+      sc.resource_id,
+      sc.title,
+      sc.cohort_code,
+      sc.college_name,
+      sc.under_review_count AS total_submissions,
+      CASE WHEN sc.under_review_count > 1 THEN sc.under_review_count - 1 ELSE 0 END AS resubmissions_count,
+      CASE 
+        WHEN sc.under_review_count > 1 
+        THEN ROUND(( (sc.under_review_count - 1)::numeric / sc.under_review_count ) * 100, 2)
+        ELSE 0 
+      END AS resubmission_rate,
+      sc.accepted_count,
+      ROUND((sc.accepted_count::numeric / NULLIF(sc.under_review_count, 0)) * 100, 2) AS acceptance_rate,
+      sc.rejected_count,
+      ROUND((sc.rejected_count::numeric / NULLIF(sc.under_review_count, 0)) * 100, 2) AS rejection_rate,
+      sc.last_submission_date
+    FROM submission_counts sc
+    LEFT JOIN raw.student_details sd
+      ON sc.student_id = sd.id
+),
+upserted AS (
+    INSERT INTO final.resubmission_count_overview AS t (
+        student_id,
+        email_id,
+        resource_id,
+        title,
+        cohort_code,
+        college_name,
+        total_submissions,
+        resubmissions_count,
+        resubmission_rate,
+        accepted_count,
+        acceptance_rate,
+        rejected_count,
+        rejection_rate,
+        last_submission_date
+    )
+    SELECT * FROM candidates
+    ON CONFLICT (student_id, resource_id)
+    DO UPDATE SET
+        email_id = EXCLUDED.email_id,
+        title = EXCLUDED.title,
+        cohort_code = EXCLUDED.cohort_code,
+        college_name = EXCLUDED.college_name,
+        total_submissions = EXCLUDED.total_submissions,
+        resubmissions_count = EXCLUDED.resubmissions_count,
+        resubmission_rate = EXCLUDED.resubmission_rate,
+        accepted_count = EXCLUDED.accepted_count,
+        acceptance_rate = EXCLUDED.acceptance_rate,
+        rejected_count = EXCLUDED.rejected_count,
+        rejection_rate = EXCLUDED.rejection_rate,
+        last_submission_date = EXCLUDED.last_submission_date
+    WHERE (
+        t.email_id, t.title, t.cohort_code, t.college_name, t.total_submissions,
+        t.resubmissions_count, t.resubmission_rate, t.accepted_count, t.acceptance_rate,
+        t.rejected_count, t.rejection_rate, t.last_submission_date
+    ) IS DISTINCT FROM (
+        EXCLUDED.email_id, EXCLUDED.title, EXCLUDED.cohort_code, EXCLUDED.college_name,
+        EXCLUDED.total_submissions, EXCLUDED.resubmissions_count,
+        EXCLUDED.resubmission_rate, EXCLUDED.accepted_count, EXCLUDED.acceptance_rate,
+        EXCLUDED.rejected_count, EXCLUDED.rejection_rate, EXCLUDED.last_submission_date
+    )
+    RETURNING (xmax = 0) AS inserted
 )
 SELECT
-  sc.student_id,
-  sd.email AS email_id,
-  sc.resource_id,
-  sc.title,
-  sc.cohort_code,
-  sc.college_name,
-  sc.under_review_count AS total_submissions,
-  CASE WHEN sc.under_review_count > 1 THEN sc.under_review_count - 1 ELSE 0 END AS resubmissions_count,
-  CASE 
-    WHEN sc.under_review_count > 1 
-    THEN ROUND(( (sc.under_review_count - 1)::numeric / sc.under_review_count ) * 100, 2)
-    ELSE 0 
-  END AS resubmission_rate,
-  sc.accepted_count,
-  ROUND((sc.accepted_count::numeric / NULLIF(sc.under_review_count, 0)) * 100, 2) AS acceptance_rate,
-  sc.rejected_count,
-  ROUND((sc.rejected_count::numeric / NULLIF(sc.under_review_count, 0)) * 100, 2) AS rejection_rate,
-  sc.last_submission_date
-FROM submission_counts sc
-LEFT JOIN raw.student_details sd
-  ON sc.student_id = sd.id
-ON CONFLICT (student_id, resource_id)
-DO UPDATE SET
-    email_id = EXCLUDED.email_id,
-    title = EXCLUDED.title,
-    cohort_code = EXCLUDED.cohort_code,
-    college_name = EXCLUDED.college_name,
-    total_submissions = EXCLUDED.total_submissions,
-    resubmissions_count = EXCLUDED.resubmissions_count,
-    resubmission_rate = EXCLUDED.resubmission_rate,                                                                                                              
-    accepted_count = EXCLUDED.accepted_count,
-    acceptance_rate = EXCLUDED.acceptance_rate,                                                       
-    rejected_count = EXCLUDED.rejected_count,
-    rejection_rate = EXCLUDED.rejection_rate,                                                                                                              
-    last_submission_date = EXCLUDED.last_submission_date;                                                                                                                                                                 
+    (SELECT COUNT(*) FROM candidates) AS candidates,
+    COUNT(*) FILTER (WHERE inserted) AS inserted,
+    COUNT(*) FILTER (WHERE NOT inserted) AS updated
+FROM upserted;
 """)
 
 student_registration_overview_upsert_query = textwrap.dedent("""
@@ -180,73 +200,104 @@ student_details AS (
         sd.email,
         sd.phone
     FROM raw.student_details sd
-)
-INSERT INTO final.student_registration_overview (
-    student_id,
-    email,
-    phone,
-    caste,
-    annual_family_income_inr,
-    "Incubator_Batch",
-    state_union_territory,
-    district,
-    country,
-    city_category,
-    form_details,
-    education_category,
-    subject_areas,
-    sub_fields_list,
-    course_name,
-    college_name,
-    university_name,
-    registration_date
+),
+candidates AS (
+    SELECT
+        sdm.student_id,
+        sdm.email,
+        sd.phone,
+        sdm.caste,
+        sdm.annual_family_income_inr,
+        sdm."Incubator_Batch",
+        sdm.state_union_territory,
+        sdm.district,
+        sdm.country,
+        sdm.city_category,
+        sdm.form_details,
+        sdm.education_category,
+        sdm.subject_areas,
+        sdm.sub_fields_list,
+        sdm.course_name,
+        sdm.college_name,
+        sdm.university_name,
+        srd.registration_date
+    FROM student_demography sdm
+    INNER JOIN student_details sd ON sdm.student_id = sd.id
+    INNER JOIN student_registration_details srd ON sd.id = srd.student_id
+),
+upserted AS (
+    INSERT INTO final.student_registration_overview AS t (
+        student_id,
+        email,
+        phone,
+        caste,
+        annual_family_income_inr,
+        "Incubator_Batch",
+        state_union_territory,
+        district,
+        country,
+        city_category,
+        form_details,
+        education_category,
+        subject_areas,
+        sub_fields_list,
+        course_name,
+        college_name,
+        university_name,
+        registration_date
+    )
+    SELECT * FROM candidates
+    ON CONFLICT (student_id,email)
+    DO UPDATE SET
+        email = EXCLUDED.email,
+        phone = EXCLUDED.phone,
+        caste = EXCLUDED.caste,
+        annual_family_income_inr = EXCLUDED.annual_family_income_inr,
+        "Incubator_Batch" = EXCLUDED."Incubator_Batch",
+        state_union_territory = EXCLUDED.state_union_territory,
+        district = EXCLUDED.district,
+        country = EXCLUDED.country,
+        city_category = EXCLUDED.city_category,
+        form_details = EXCLUDED.form_details,
+        education_category = EXCLUDED.education_category,
+        subject_areas = EXCLUDED.subject_areas,
+        sub_fields_list = EXCLUDED.sub_fields_list,
+        course_name = EXCLUDED.course_name,
+        college_name = EXCLUDED.college_name,
+        university_name = EXCLUDED.university_name,
+        registration_date = EXCLUDED.registration_date
+    WHERE (
+        t.email, t.phone, t.caste, t.annual_family_income_inr, t."Incubator_Batch",
+        t.state_union_territory, t.district, t.country, t.city_category, t.form_details,
+        t.education_category, t.subject_areas, t.sub_fields_list, t.course_name,
+        t.college_name, t.university_name, t.registration_date
+    ) IS DISTINCT FROM (
+        EXCLUDED.email, EXCLUDED.phone, EXCLUDED.caste,
+        EXCLUDED.annual_family_income_inr, EXCLUDED."Incubator_Batch",
+        EXCLUDED.state_union_territory, EXCLUDED.district, EXCLUDED.country,
+        EXCLUDED.city_category, EXCLUDED.form_details, EXCLUDED.education_category,
+        EXCLUDED.subject_areas, EXCLUDED.sub_fields_list, EXCLUDED.course_name,
+        EXCLUDED.college_name, EXCLUDED.university_name, EXCLUDED.registration_date
+    )
+    RETURNING (xmax = 0) AS inserted
 )
 SELECT
-    sdm.student_id,
-    sdm.email,
-    sd.phone,
-    sdm.caste,
-    sdm.annual_family_income_inr,
-    sdm."Incubator_Batch",
-    sdm.state_union_territory,
-    sdm.district,
-    sdm.country,
-    sdm.city_category,
-    sdm.form_details,
-    sdm.education_category,
-    sdm.subject_areas,
-    sdm.sub_fields_list,
-    sdm.course_name,
-    sdm.college_name,
-    sdm.university_name,
-    srd.registration_date
-FROM student_demography sdm
-INNER JOIN student_details sd ON sdm.student_id = sd.id
-INNER JOIN student_registration_details srd ON sd.id = srd.student_id
-ON CONFLICT (student_id,email)
-DO UPDATE SET
-    email = EXCLUDED.email,
-    phone = EXCLUDED.phone,
-    caste = EXCLUDED.caste,
-    annual_family_income_inr = EXCLUDED.annual_family_income_inr,
-    "Incubator_Batch" = EXCLUDED."Incubator_Batch",
-    state_union_territory = EXCLUDED.state_union_territory,
-    district = EXCLUDED.district,
-    country = EXCLUDED.country,
-    city_category = EXCLUDED.city_category,
-    form_details = EXCLUDED.form_details,
-    education_category = EXCLUDED.education_category,
-    subject_areas = EXCLUDED.subject_areas,
-    sub_fields_list = EXCLUDED.sub_fields_list,
-    course_name = EXCLUDED.course_name,
-    college_name = EXCLUDED.college_name,
-    university_name = EXCLUDED.university_name,
-    registration_date = EXCLUDED.registration_date;
+    (SELECT COUNT(*) FROM candidates) AS candidates,
+    COUNT(*) FILTER (WHERE inserted) AS inserted,
+    COUNT(*) FILTER (WHERE NOT inserted) AS updated
+FROM upserted;
 """)
 
-with engine.begin() as conn:
-    conn.execute(text(resubmission_count_overview_upsert_query))
-    print("* Data upserted to 'final.resubmission_count_overview'.")
+if __name__ == "__main__":
+
+    clean_general_information_sheet()
+
+    engine = get_engine("bulk_load")
+    with engine.begin() as conn:
+        inserted, updated, unchanged = run_counted_upsert(conn, text(resubmission_count_overview_upsert_query))
+        print("* Data upserted to 'final.resubmission_count_overview'.")
+        print(f"   - Rows inserted: {inserted}, updated: {updated}, unchanged: {unchanged}")
 
-    conn.execute(text(student_registration_overview_upsert_query))
-    print("* Data upserted to 'final.student_registration_overview'.")
\ No newline at end of file
+        inserted, updated, unchanged = run_counted_upsert(conn, text(student_registration_overview_upsert_query))
+        print("* Data upserted to 'final.student_registration_overview'.")
+        print(f"   - Rows inserted: {inserted}, updated: {updated}, unchanged: {unchanged}")
\ No newline at end of file
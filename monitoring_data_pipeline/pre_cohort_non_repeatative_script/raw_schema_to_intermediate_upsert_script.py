@@ -3,11 +3,9 @@ import sys
 import pandas as pd
 from sqlalchemy import text
 
+from deployment_scripts.bulk_load import run_counted_upsert
 from deployment_scripts.connection import get_engine, get_session, metadata
 
-# SQLAlchemy engine
-engine = get_engine()
-
 # -------------------------------
 # Function to handle duplicates, CSV export, and unique constraint
 # -------------------------------
@@ -19,6 +17,7 @@ def prepare_table_for_upsert(table_name, unique_columns, csv_filename):
     GROUP BY {', '.join(unique_columns)}
     HAVING COUNT(*) > 1;
     """
+    engine = get_engine("bulk_load")
     with engine.begin() as conn:
         dup_df = pd.read_sql(dup_query, conn)
         if not dup_df.empty:
@@ -60,6 +59,7 @@ def clean_general_information_sheet():
     GROUP BY "Email"
     HAVING COUNT(*) > 1;
     """
+    engine = get_engine("bulk_load")
     with engine.begin() as conn:
         dup_df = pd.read_sql(dup_query, conn)
         if not dup_df.empty:
@@ -78,9 +78,8 @@ def clean_general_information_sheet():
             print("* No duplicates found in old.general_information_sheet.")
 
 # -------------------------------
-# Prepare tables for upsert
+# Prepare tables for upsert (run from __main__)
 # -------------------------------
-clean_general_information_sheet()
 #prepare_table_for_upsert("intermediate.final_quiz", ["student_id", "resource_id"], "duplicate_final_quiz.csv")
 #prepare_table_for_upsert("intermediate.final_assignment", ["student_id", "resource_id", "submitted_at"], "duplicate_final_assignment.csv")
 #prepare_table_for_upsert("intermediate.daily_weekly_attendance",["student_id", "session_id"],"duplicate_daily_weekly_student_attendance.csv")
@@ -99,8 +98,14 @@ WITH student_details AS (
         sd.location_id,
         gs."Incubator_Batch"
     FROM raw.student_details sd
-    JOIN old.general_information_sheet gs
-        ON sd.email = gs."Email"
+    JOIN (
+        -- One row per email_key: emails differing only in case or spaces would fan out the join.
+        -- The latest row wins, as in clean_general_information_sheet.
+        SELECT DISTINCT ON (email_key) email_key, "Incubator_Batch"
+        FROM old.general_information_sheet
+        ORDER BY email_key, ctid DESC
+    ) gs
+        ON sd.email_key = gs.email_key
 ),
 student_registration AS (
     SELECT
@@ -148,69 +153,92 @@ non_aggregated AS (
         college_name,
         university_name
     FROM mapped_subjects
-)
-INSERT INTO intermediate.student_demography (
-    student_id,
-    email,
-    caste,
-    annual_family_income_inr,
-    "Incubator_Batch",
-    state_union_territory,
-    district,
-    country,
-    city_category,
-    form_details,
-    education_category,
-    subject_areas,
-    sub_fields_list,
-    course_name,
-    college_name,
-    university_name
+),
+candidates AS (
+    SELECT
+        sd.id AS student_id,
+        sd.email,
+        sd.caste,
+        sd.annual_family_income_inr,
+        sd."Incubator_Batch",
+        lm.state_union_territory,
+        lm.district,
+        lm.country,
+        lm.city_category,
+        sr.form_details,
+        asub.education_category,
+        asub.subject_areas,
+        asub.sub_fields_list,
+        na.course_name,
+        na.college_name,
+        na.university_name
+    FROM student_details sd
+    LEFT JOIN raw.location_mapping lm
+        ON sd.location_id = lm.location_id
+    LEFT JOIN student_registration sr
+        ON sd.id = sr.student_id
+    LEFT JOIN aggregated_subjects asub
+        ON sd.id = asub.student_id
+    LEFT JOIN non_aggregated na
+        ON sd.id = na.student_id
+        AND asub.education_course_id = na.education_course_id
+),
+upserted AS (
+    INSERT INTO intermediate.student_demography AS t (
+        student_id,
+        email,
+        caste,
+        annual_family_income_inr,
+        "Incubator_Batch",
+        state_union_territory,
+        district,
+        country,
+        city_category,
+        form_details,
+        education_category,
+        subject_areas,
+        sub_fields_list,
+        course_name,
+        college_name,
+        university_name
+    )
+    SELECT * FROM candidates
+    ON CONFLICT (email)
+    DO UPDATE SET
+        student_id = EXCLUDED.student_id,
+        caste = EXCLUDED.caste,
+        annual_family_income_inr = EXCLUDED.annual_family_income_inr,
+        "Incubator_Batch" = EXCLUDED."Incubator_Batch",
+        state_union_territory = EXCLUDED.state_union_territory,
+        district = EXCLUDED.district,
+        country = EXCLUDED.country,
+        city_category = EXCLUDED.city_category,
+        form_details = EXCLUDED.form_details,
+        education_category = EXCLUDED.education_category,
+        subject_areas = EXCLUDED.subject_areas,
+        sub_fields_list = EXCLUDED.sub_fields_list,
+        course_name = EXCLUDED.course_name,
+        college_name = EXCLUDED.college_name,
+        university_name = EXCLUDED.university_name
+    WHERE (
+        t.student_id, t.caste, t.annual_family_income_inr, t."Incubator_Batch",
+        t.state_union_territory, t.district, t.country, t.city_category, t.form_details,
+        t.education_category, t.subject_areas, t.sub_fields_list, t.course_name,
+        t.college_name, t.university_name
+    ) IS DISTINCT FROM (
+        EXCLUDED.student_id, EXCLUDED.caste, EXCLUDED.annual_family_income_inr,
+        EXCLUDED."Incubator_Batch", EXCLUDED.state_union_territory, EXCLUDED.district,
+        EXCLUDED.country, EXCLUDED.city_category, EXCLUDED.form_details,
+        EXCLUDED.education_category, EXCLUDED.subject_areas, EXCLUDED.sub_fields_list,
+        EXCLUDED.course_name, EXCLUDED.college_name, EXCLUDED.university_name
+    )
+    RETURNING (xmax = 0) AS inserted
 )
 SELECT
-    sd.id AS student_id,
-    sd.email,
-    sd.caste,
-    sd.annual_family_income_inr,
-    sd."Incubator_Batch",
-    lm.state_union_territory,
-    lm.district,
-    lm.country,
-    lm.city_category,
-    sr.form_details,
-    asub.education_category,
-    asub.subject_areas,
-    asub.sub_fields_list,
-    na.course_name,
-    na.college_name,
-    na.university_name
-FROM student_details sd
-LEFT JOIN raw.location_mapping lm
-    ON sd.location_id = lm.location_id
-LEFT JOIN student_registration sr
-    ON sd.id = sr.student_id
-LEFT JOIN aggregated_subjects asub
-    ON sd.id = asub.student_id
-LEFT JOIN non_aggregated na
-    ON sd.id = na.student_id
-    AND asub.education_course_id = na.education_course_id
-ON CONFLICT (email)
-DO UPDATE SET
-    student_id = EXCLUDED.student_id,
-    caste = EXCLUDED.caste,
-    annual_family_income_inr = EXCLUDED.annual_family_income_inr,
-    "Incubator_Batch" = EXCLUDED."Incubator_Batch",
-    state_union_territory = EXCLUDED.state_union_territory,
-    district = EXCLUDED.district,
-    country = EXCLUDED.country,
-    city_category = EXCLUDED.city_category,
-    form_details = EXCLUDED.form_details,
-    education_category = EXCLUDED.education_category,
-    subject_areas = EXCLUDED.subject_areas,
-    sub_fields_list = EXCLUDED.sub_fields_list,
-    course_name = EXCLUDED.course_name,
-    college_name = EXCLUDED.college_name,
-    university_name = EXCLUDED.university_name;
+    (SELECT COUNT(*) FROM candidates) AS candidates,
+    COUNT(*) FILTER (WHERE inserted) AS inserted,
+    COUNT(*) FILTER (WHERE NOT inserted) AS updated
+FROM upserted;
 """)
 
 
@@ -235,8 +263,12 @@ WITH student_quiz AS (
         ON sd.resource_id = gs.id
     JOIN raw.student_details sds
         ON sd.student_id = sds.id
-    JOIN old.general_information_sheet gis
-        ON sds.email = gis."Email"
+    JOIN (
+        SELECT DISTINCT ON (email_key) email_key, "Incubator_Batch"
+        FROM old.general_information_sheet
+        ORDER BY email_key, ctid DESC
+    ) gis
+        ON sds.email_key = gis.email_key
     
 ),
 student_registration AS (
@@ -282,80 +314,104 @@ non_aggregated AS (
         college_name,
         university_name
     FROM mapped_subjects
-)
-INSERT INTO intermediate.final_quiz (
-    id,
-    resource_id,
-    student_id,
-    "Incubator_Batch",
-    category,
-    title,
-    cohort_code,
-    marks,
-    max_marks,
-    form_details,
-    state_union_territory,
-    district,
-    country,
-    city_category,
-    education_category,
-    subject_areas,
-    sub_fields_list,
-    course_name,
-    college_name,
-    university_name
+),
+candidates AS (
+    SELECT
+        ss.id,
+        ss.resource_id,
+        ss.student_id,
+        ss."Incubator_Batch",
+        ss.category,
+        ss.title,
+        ss.cohort_code,
+        ss.marks,
+        ss.max_marks,
+        sr.form_details,
+        lm.state_union_territory,
+        lm.district,
+        lm.country,
+        lm.city_category,
+        asub.education_category,
+        asub.subject_areas,
+        asub.sub_fields_list,
+        na.course_name,
+        na.college_name,
+        na.university_name
+    FROM student_quiz ss
+    LEFT JOIN raw.location_mapping lm
+        ON ss.location_id = lm.location_id
+    LEFT JOIN student_registration sr
+        ON ss.student_id = sr.student_id
+    LEFT JOIN aggregated_subjects asub
+        ON ss.student_id = asub.student_id
+    LEFT JOIN non_aggregated na
+        ON ss.student_id = na.student_id
+        AND asub.education_course_id = na.education_course_id
+),
+upserted AS (
+    INSERT INTO intermediate.final_quiz AS t (
+        id,
+        resource_id,
+        student_id,
+        "Incubator_Batch",
+        category,
+        title,
+        cohort_code,
+        marks,
+        max_marks,
+        form_details,
+        state_union_territory,
+        district,
+        country,
+        city_category,
+        education_category,
+        subject_areas,
+        sub_fields_list,
+        course_name,
+        college_name,
+        university_name
+    )
+    SELECT * FROM candidates
+    ON CONFLICT (student_id, resource_id)
+    DO UPDATE SET
+        student_id = EXCLUDED.student_id,
+        "Incubator_Batch" = EXCLUDED."Incubator_Batch",
+        category = EXCLUDED.category,
+        title = EXCLUDED.title,
+        cohort_code = EXCLUDED.cohort_code,
+        marks = EXCLUDED.marks,
+        max_marks = EXCLUDED.max_marks,
+        form_details = EXCLUDED.form_details,
+        state_union_territory = EXCLUDED.state_union_territory,
+        district = EXCLUDED.district,
+        country = EXCLUDED.country,
+        city_category = EXCLUDED.city_category,
+        education_category = EXCLUDED.education_category,
+        subject_areas = EXCLUDED.subject_areas,
+        sub_fields_list = EXCLUDED.sub_fields_list,
+        course_name = EXCLUDED.course_name,
+        college_name = EXCLUDED.college_name,
+        university_name = EXCLUDED.university_name
+    WHERE (
+        t.student_id, t."Incubator_Batch", t.category, t.title, t.cohort_code, t.marks,
+        t.max_marks, t.form_details, t.state_union_territory, t.district, t.country,
+        t.city_category, t.education_category, t.subject_areas, t.sub_fields_list,
+        t.course_name, t.college_name, t.university_name
+    ) IS DISTINCT FROM (
+        EXCLUDED.student_id, EXCLUDED."Incubator_Batch", EXCLUDED.category,
+        EXCLUDED.title, EXCLUDED.cohort_code, EXCLUDED.marks, EXCLUDED.max_marks,
+        EXCLUDED.form_details, EXCLUDED.state_union_territory, EXCLUDED.district,
+        EXCLUDED.country, EXCLUDED.city_category, EXCLUDED.education_category,
+        EXCLUDED.subject_areas, EXCLUDED.sub_fields_list, EXCLUDED.course_name,
+        EXCLUDED.college_name, EXCLUDED.university_name
+    )
+    RETURNING (xmax = 0) AS inserted
 )
 SELECT
-    ss.id,
-    ss.resource_id,
-    ss.student_id,
-    ss."Incubator_Batch",
-    ss.category,
-    ss.title,
-    ss.cohort_code,
-    ss.marks,
-    ss.max_marks,
-    sr.form_details,
-    lm.state_union_territory,
-    lm.district,
-    lm.country,
-    lm.city_category,
-    asub.education_category,
-    asub.subject_areas,
-    asub.sub_fields_list,
-    na.course_name,
-    na.college_name,
-    na.university_name
-FROM student_quiz ss
-LEFT JOIN raw.location_mapping lm
-    ON ss.location_id = lm.location_id
-LEFT JOIN student_registration sr
-    ON ss.student_id = sr.student_id
-LEFT JOIN aggregated_subjects asub
-    ON ss.student_id = asub.student_id
-LEFT JOIN non_aggregated na
-    ON ss.student_id = na.student_id
-    AND asub.education_course_id = na.education_course_id
-ON CONFLICT (student_id, resource_id)
-DO UPDATE SET
-    student_id = EXCLUDED.student_id,
-    "Incubator_Batch" = EXCLUDED."Incubator_Batch",
-    category = EXCLUDED.category,
-    title = EXCLUDED.title,
-    cohort_code = EXCLUDED.cohort_code,
-    marks = EXCLUDED.marks,
-    max_marks = EXCLUDED.max_marks,
-    form_details = EXCLUDED.form_details,
-    state_union_territory = EXCLUDED.state_union_territory,
-    district = EXCLUDED.district,
-    country = EXCLUDED.country,
-    city_category = EXCLUDED.city_category,
-    education_category = EXCLUDED.education_category,
-    subject_areas = EXCLUDED.subject_areas,
-    sub_fields_list = EXCLUDED.sub_fields_list,
-    course_name = EXCLUDED.course_name,
-    college_name = EXCLUDED.college_name,
-    university_name = EXCLUDED.university_name;
+    (SELECT COUNT(*) FROM candidates) AS candidates,
+    COUNT(*) FILTER (WHERE inserted) AS inserted,
+    COUNT(*) FILTER (WHERE NOT inserted) AS updated
+FROM upserted;
 """)
 
 # -------------------------------
@@ -380,8 +436,12 @@ WITH student_assignment AS (
         ON sd.resource_id = gs.id
     JOIN raw.student_details sds
         ON sd.student_id = sds.id                           
-    JOIN old.general_information_sheet gis
-        ON sds.email = gis."Email"
+    JOIN (
+        SELECT DISTINCT ON (email_key) email_key, "Incubator_Batch"
+        FROM old.general_information_sheet
+        ORDER BY email_key, ctid DESC
+    ) gis
+        ON sds.email_key = gis.email_key
     
 ),
 student_registration AS (
@@ -427,76 +487,100 @@ non_aggregated AS (
         college_name,
         university_name
     FROM mapped_subjects
-)
-INSERT INTO intermediate.final_assignment (
-    student_id,
-    "Incubator_Batch",
-    resource_id,
-    category,
-    title,
-    cohort_code,
-    submission_status,
-    submitted_at,
-    form_details,
-    state_union_territory,
-    district,
-    country,
-    city_category,
-    education_category,
-    subject_areas,
-    sub_fields_list,
-    course_name,
-    college_name,
-    university_name
+),
+candidates AS (
+    SELECT
+        ss.student_id,
+        ss."Incubator_Batch",
+        ss.student_resource_id AS resource_id,
+        ss.category,
+        ss.title,
+        ss.cohort_code,
+        ss.submission_status,
+        ss.submitted_at,
+        sr.form_details,
+        lm.state_union_territory,
+        lm.district,
+        lm.country,
+        lm.city_category,
+        asub.education_category,
+        asub.subject_areas,
+        asub.sub_fields_list,
+        na.course_name,
+        na.college_name,
+        na.university_name
+    FROM student_assignment ss
+    LEFT JOIN raw.location_mapping lm
+        ON ss.location_id = lm.location_id
+    LEFT JOIN student_registration sr
+        ON ss.student_id = sr.student_id
+    LEFT JOIN aggregated_subjects asub
+        ON ss.student_id = asub.student_id
+    LEFT JOIN non_aggregated na
+        ON ss.student_id = na.student_id
+        AND asub.education_course_id = na.education_course_id
+),
+upserted AS (
+    INSERT INTO intermediate.final_assignment AS t (
+        student_id,
+        "Incubator_Batch",
+        resource_id,
+        category,
+        title,
+        cohort_code,
+        submission_status,
+        submitted_at,
+        form_details,
+        state_union_territory,
+        district,
+        country,
+        city_category,
+        education_category,
+        subject_areas,
+        sub_fields_list,
+        course_name,
+        college_name,
+        university_name
+    )
+    SELECT * FROM candidates
+    ON CONFLICT (student_id, resource_id, submitted_at)
+    DO UPDATE SET
+        "Incubator_Batch" = EXCLUDED."Incubator_Batch",
+        category = EXCLUDED.category,
+        title = EXCLUDED.title,
+        cohort_code = EXCLUDED.cohort_code,
+        submission_status = EXCLUDED.submission_status,
+        form_details = EXCLUDED.form_details,
+        state_union_territory = EXCLUDED.state_union_territory,
+        district = EXCLUDED.district,
+        country = EXCLUDED.country,
+        city_category = EXCLUDED.city_category,
+        education_category = EXCLUDED.education_category,
+        subject_areas = EXCLUDED.subject_areas,
+        sub_fields_list = EXCLUDED.sub_fields_list,
+        course_name = EXCLUDED.course_name,
+        college_name = EXCLUDED.college_name,
+        university_name = EXCLUDED.university_name
+    WHERE (
+        t."Incubator_Batch", t.category, t.title, t.cohort_code, t.submission_status,
+        t.form_details, t.state_union_territory, t.district, t.country, t.city_category,
+        t.education_category, t.subject_areas, t.sub_fields_list, t.course_name,
+        t.college_name, t.university_name
+    ) IS DISTINCT FROM (
+        EXCLUDED."Incubator_Batch", EXCLUDED.category, EXCLUDED.title,
+        EXCLUDED.cohort_code, EXCLUDED.submission_status, EXCLUDED.form_details,
+        EXCLUDED.state_union_territory, EXCLUDED.district, EXCLUDED.country,
+        EXCLUDED.city_category, EXCLUDED.education_category, EXCLUDED.subject_areas,
+        EXCLUDED.sub_fields_list, EXCLUDED.course_name, EXCLUDED.college_name,
+        EXCLUDED.university_name
+    )
+    RETURNING (xmax = 0) AS inserted
 )
 SELECT
-    ss.student_id,
-    ss."Incubator_Batch",
-    ss.student_resource_id AS resource_id,
-    ss.category,
-    ss.title,
-    ss.cohort_code,
-    ss.submission_status,
-    ss.submitted_at,
-    sr.form_details,
-    lm.state_union_territory,
-    lm.district,
-    lm.country,
-    lm.city_category,
-    asub.education_category,
-    asub.subject_areas,
-    asub.sub_fields_list,
-    na.course_name,
-    na.college_name,
-    na.university_name
-FROM student_assignment ss
-LEFT JOIN raw.location_mapping lm
-    ON ss.location_id = lm.location_id
-LEFT JOIN student_registration sr
-    ON ss.student_id = sr.student_id
-LEFT JOIN aggregated_subjects asub
-    ON ss.student_id = asub.student_id
-LEFT JOIN non_aggregated na
-    ON ss.student_id = na.student_id
-    AND asub.education_course_id = na.education_course_id
-ON CONFLICT (student_id, resource_id, submitted_at)
-DO UPDATE SET
-    "Incubator_Batch" = EXCLUDED."Incubator_Batch",
-    category = EXCLUDED.category,
-    title = EXCLUDED.title,
-    cohort_code = EXCLUDED.cohort_code,
-    submission_status = EXCLUDED.submission_status,
-    form_details = EXCLUDED.form_details,
-    state_union_territory = EXCLUDED.state_union_territory,
-    district = EXCLUDED.district,
-    country = EXCLUDED.country,
-    city_category = EXCLUDED.city_category,
-    education_category = EXCLUDED.education_category,
-    subject_areas = EXCLUDED.subject_areas,
-    sub_fields_list = EXCLUDED.sub_fields_list,
-    course_name = EXCLUDED.course_name,
-    college_name = EXCLUDED.college_name,
-    university_name = EXCLUDED.university_name;
+    (SELECT COUNT(*) FROM candidates) AS candidates,
+    COUNT(*) FILTER (WHERE inserted) AS inserted,
+    COUNT(*) FILTER (WHERE NOT inserted) AS updated
+FROM upserted;
 """)
 
 # -------------------------------
@@ -537,8 +621,12 @@ student_attendance AS (
         ON sd.session_id = ls.id
     JOIN raw.student_details sdet
         ON sd.student_id = sdet.id
-    JOIN old.general_information_sheet gis
-        ON sdet.email = gis."Email"
+    JOIN (
+        SELECT DISTINCT ON (email_key) email_key, "Incubator_Batch"
+        FROM old.general_information_sheet
+        ORDER BY email_key, ctid DESC
+    ) gis
+        ON sdet.email_key = gis.email_key
 ),
 
 student_registration AS (
@@ -589,81 +677,104 @@ non_aggregated AS (
         college_name,
         university_name
     FROM mapped_subjects
-)
-
-INSERT INTO intermediate.daily_weekly_attendance (
-    weekday_name,
-    student_id,
-    session_id,
-    incubator_batch,
-    title,
-    code,
-    conducted_on,
-    attended_on,
-    duration_in_sec,
-    form_details,
-    state_union_territory,
-    district,
-    country,
-    city_category,
-    education_category,
-    subject_areas,
-    sub_fields_list,
-    course_name,
-    college_name,
-    university_name
+),
+candidates AS (
+    SELECT
+        TRIM(TO_CHAR(sa.attended_on, 'Day')) AS weekday_name,  
+        sa.student_id,
+        sa.session_id,
+        sa.incubator_batch,
+        sa.title,
+        sa.code,
+        sa.conducted_on,
+        sa.attended_on,
+        sa.duration_in_sec,
+        sr.form_details,
+        lm.state_union_territory,
+        lm.district,
+        lm.country,
+        lm.city_category,
+        asub.education_category,
+        asub.subject_areas,
+        asub.sub_fields_list,
+        na.course_name,
+        na.college_name,
+        na.university_name
+    FROM student_attendance sa
+    LEFT JOIN raw.location_mapping lm
+        ON sa.location_id = lm.location_id
+    LEFT JOIN student_registration sr
+        ON sa.student_id = sr.student_id
+    LEFT JOIN aggregated_subjects asub
+        ON sa.student_id = asub.student_id
+    LEFT JOIN non_aggregated na
+        ON sa.student_id = na.student_id
+       AND asub.education_course_id = na.education_course_id
+),
+upserted AS (
+    INSERT INTO intermediate.daily_weekly_attendance AS t (
+        weekday_name,
+        student_id,
+        session_id,
+        incubator_batch,
+        title,
+        code,
+        conducted_on,
+        attended_on,
+        duration_in_sec,
+        form_details,
+        state_union_territory,
+        district,
+        country,
+        city_category,
+        education_category,
+        subject_areas,
+        sub_fields_list,
+        course_name,
+        college_name,
+        university_name
+    )
+    SELECT * FROM candidates
+    ON CONFLICT (student_id, session_id)
+    DO UPDATE SET
+        weekday_name = EXCLUDED.weekday_name,
+        incubator_batch = EXCLUDED.incubator_batch,
+        title = EXCLUDED.title,
+        code = EXCLUDED.code,
+        conducted_on = EXCLUDED.conducted_on,
+        attended_on = EXCLUDED.attended_on,
+        duration_in_sec = EXCLUDED.duration_in_sec,
+        form_details = EXCLUDED.form_details,
+        state_union_territory = EXCLUDED.state_union_territory,
+        district = EXCLUDED.district,
+        country = EXCLUDED.country,
+        city_category = EXCLUDED.city_category,
+        education_category = EXCLUDED.education_category,
+        subject_areas = EXCLUDED.subject_areas,
+        sub_fields_list = EXCLUDED.sub_fields_list,
+        course_name = EXCLUDED.course_name,
+        college_name = EXCLUDED.college_name,
+        university_name = EXCLUDED.university_name
+    WHERE (
+        t.weekday_name, t.incubator_batch, t.title, t.code, t.conducted_on,
+        t.attended_on, t.duration_in_sec, t.form_details, t.state_union_territory,
+        t.district, t.country, t.city_category, t.education_category, t.subject_areas,
+        t.sub_fields_list, t.course_name, t.college_name, t.university_name
+    ) IS DISTINCT FROM (
+        EXCLUDED.weekday_name, EXCLUDED.incubator_batch, EXCLUDED.title, EXCLUDED.code,
+        EXCLUDED.conducted_on, EXCLUDED.attended_on, EXCLUDED.duration_in_sec,
+        EXCLUDED.form_details, EXCLUDED.state_union_territory, EXCLUDED.district,
+        EXCLUDED.country, EXCLUDED.city_category, EXCLUDED.education_category,
+        EXCLUDED.subject_areas, EXCLUDED.sub_fields_list, EXCLUDED.course_name,
+        EXCLUDED.college_name, EXCLUDED.university_name
+    )
+    RETURNING (xmax = 0) AS inserted
 )
 SELECT
-    TRIM(TO_CHAR(sa.attended_on, 'Day')) AS weekday_name,  
-    sa.student_id,
-    sa.session_id,
-    sa.incubator_batch,
-    sa.title,
-    sa.code,
-    sa.conducted_on,
-    sa.attended_on,
-    sa.duration_in_sec,
-    sr.form_details,
-    lm.state_union_territory,
-    lm.district,
-    lm.country,
-    lm.city_category,
-    asub.education_category,
-    asub.subject_areas,
-    asub.sub_fields_list,
-    na.course_name,
-    na.college_name,
-    na.university_name
-FROM student_attendance sa
-LEFT JOIN raw.location_mapping lm
-    ON sa.location_id = lm.location_id
-LEFT JOIN student_registration sr
-    ON sa.student_id = sr.student_id
-LEFT JOIN aggregated_subjects asub
-    ON sa.student_id = asub.student_id
-LEFT JOIN non_aggregated na
-    ON sa.student_id = na.student_id
-   AND asub.education_course_id = na.education_course_id
-ON CONFLICT (student_id, session_id)
-DO UPDATE SET
-    weekday_name = EXCLUDED.weekday_name,
-    incubator_batch = EXCLUDED.incubator_batch,
-    title = EXCLUDED.title,
-    code = EXCLUDED.code,
-    conducted_on = EXCLUDED.conducted_on,
-    attended_on = EXCLUDED.attended_on,
-    duration_in_sec = EXCLUDED.duration_in_sec,
-    form_details = EXCLUDED.form_details,
-    state_union_territory = EXCLUDED.state_union_territory,
-    district = EXCLUDED.district,
-    country = EXCLUDED.country,
-    city_category = EXCLUDED.city_category,
-    education_category = EXCLUDED.education_category,
-    subject_areas = EXCLUDED.subject_areas,
-    sub_fields_list = EXCLUDED.sub_fields_list,
-    course_name = EXCLUDED.course_name,
-    college_name = EXCLUDED.college_name,
-    university_name = EXCLUDED.university_name;
+    (SELECT COUNT(*) FROM candidates) AS candidates,
+    COUNT(*) FILTER (WHERE inserted) AS inserted,
+    COUNT(*) FILTER (WHERE NOT inserted) AS updated
+FROM upserted;
 """)
 
 # -------------------------------
@@ -672,36 +783,39 @@ DO UPDATE SET
 
 if __name__ == "__main__":
 
+    clean_general_information_sheet()
+
+    engine = get_engine("bulk_load")
     with engine.begin() as conn:
         try:
             prepare_table_for_upsert("intermediate.final_quiz", ["student_id", "resource_id"], "duplicate_final_quiz.csv")
-            quiz_result = conn.execute(quiz_upsert_query)
+            inserted, updated, unchanged = run_counted_upsert(conn, quiz_upsert_query)
             print("* Data upserted to 'intermediate.final_quiz'.")
-            print(f"   - Rows inserted/updated: {quiz_result.rowcount}")
+            print(f"   - Rows inserted: {inserted}, updated: {updated}, unchanged: {unchanged}")
         except Exception as e:
             print(f"! Failed to upsert into 'intermediate.final_quiz': {e}")
 
         try:
             prepare_table_for_upsert("intermediate.student_demography", ["email"], "duplicate_final_student_demography.csv")
-            demography_result = conn.execute(student_demography_upsert_query)
+            inserted, updated, unchanged = run_counted_upsert(conn, student_demography_upsert_query)
             print("* Data upserted to 'intermediate.student_demography'.")
-            print(f"   - Rows inserted/updated: {demography_result.rowcount}")
+            print(f"   - Rows inserted: {inserted}, updated: {updated}, unchanged: {unchanged}")
         except Exception as e:
             print(f"! Failed to upsert into 'intermediate.student_demography': {e}")
 
         try:
             prepare_table_for_upsert("intermediate.final_assignment", ["student_id", "resource_id", "submitted_at"], "duplicate_final_assignment.csv")
-            assign_result = conn.execute(assignment_upsert_query)
+            inserted, updated, unchanged = run_counted_upsert(conn, assignment_upsert_query)
             print("* Data upserted to 'intermediate.final_assignment'.")
-            print(f"   - Rows inserted/updated: {assign_result.rowcount}")
+            print(f"   - Rows inserted: {inserted}, updated: {updated}, unchanged: {unchanged}")
         except Exception as e:
             print(f"! Failed to upsert into 'intermediate.final_assignment': {e}")
 
         try:
             prepare_table_for_upsert("intermediate.daily_weekly_attendance",["student_id", "session_id"],"duplicate_daily_weekly_student_attendance.csv")
-            attendance_result = conn.execute(attendance_upsert_query)
+            inserted, updated, unchanged = run_counted_upsert(conn, attendance_upsert_query)
             print("* Data upserted to 'intermediate.daily_weekly_attendance'.")
-            print(f"   - Rows inserted/updated: {attendance_result.rowcount}")
+            print(f"   - Rows inserted: {inserted}, updated: {updated}, unchanged: {unchanged}")
         except Exception as e:
             print(f"! Failed to upsert into 'intermediate.daily_weekly_attendance': {e}")
 
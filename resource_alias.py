@@ -0,0 +1,109 @@
+from sqlalchemy import text
+
+from deployment_scripts.ingest_ledger import INGESTED_AT_COLUMN
+
+ALIAS_TABLE = "raw.resource_alias"
+
+# Titles are compared case-insensitively, trimmed, with runs of whitespace collapsed
+NORMALIZE_FUNCTION = "raw.normalize_title"
+
+# old.* rows resolved through each alias category: (source table, title column,
+# extra condition on the source rows). Used by the old -> raw upserts.
+TITLE_SOURCES = {
+    "Assignment": ("assignment_monitoring_data", '"assignment_name"', "TRUE"),
+    "Quiz": ("incubator_quiz_monitoring", '"data_fields"', "TRUE"),
+    "Pre-recorded Video": ("student_session_information", '"Session_Code"', "session_kind = 'pre_recorded'"),
+}
+
+
+def ensure_resource_alias(conn):
+    """Create the title normalization function and the alias lookup table."""
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION {NORMALIZE_FUNCTION}(title TEXT) RETURNS TEXT AS $$
+            SELECT lower(regexp_replace(btrim(title), '\\s+', ' ', 'g'))
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {ALIAS_TABLE} (
+            category TEXT NOT NULL,
+            alias_key TEXT NOT NULL,
+            resource_id INT NOT NULL REFERENCES raw.resource (id) ON DELETE CASCADE,
+            alias TEXT NOT NULL,
+            is_title BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (category, alias_key)
+        )
+    """))
+
+
+def sync_title_aliases(conn):
+    """Add every current raw.resource title as an alias of its resource; returns aliases added or changed.
+
+    Aliases of earlier titles are kept, so exports that still use a
+    resource's old name keep resolving after a rename. Manual aliases are
+    never overwritten. When two resources of a category share a normalized
+    title, the lowest id wins.
+    """
+    return conn.execute(text(f"""
+        INSERT INTO {ALIAS_TABLE} AS t (category, alias_key, resource_id, alias, is_title)
+        SELECT DISTINCT ON (category::TEXT, {NORMALIZE_FUNCTION}(title))
+            category::TEXT, {NORMALIZE_FUNCTION}(title), id, title, TRUE
+        FROM raw.resource
+        WHERE category IS NOT NULL AND NULLIF(btrim(title), '') IS NOT NULL
+        ORDER BY category::TEXT, {NORMALIZE_FUNCTION}(title), id
+        ON CONFLICT (category, alias_key) DO UPDATE SET
+            resource_id = EXCLUDED.resource_id,
+            alias = EXCLUDED.alias
+        WHERE t.is_title
+          AND (t.resource_id, t.alias) IS DISTINCT FROM (EXCLUDED.resource_id, EXCLUDED.alias)
+    """)).rowcount
+
+
+def add_alias(conn, category, alias, resource_id):
+    """Map `alias` to a resource for one category, replacing any earlier mapping of the same key."""
+    conn.execute(text(f"""
+        INSERT INTO {ALIAS_TABLE} (category, alias_key, resource_id, alias, is_title)
+        VALUES (:category, {NORMALIZE_FUNCTION}(:alias), :resource_id, :alias, FALSE)
+        ON CONFLICT (category, alias_key) DO UPDATE SET
+            resource_id = EXCLUDED.resource_id,
+            alias = EXCLUDED.alias,
+            is_title = FALSE
+    """), {"category": category, "alias": alias, "resource_id": resource_id})
+
+
+def restamp_aliased_rows(conn, category, aliases):
+    """Set ingested_at = now() on the old.* rows of `category` whose title matches one of `aliases`.
+
+    Rows already behind the old -> raw watermark are otherwise never read
+    again, so a new alias would not resolve them. Returns rows re-stamped.
+    """
+    source, title_column, condition = TITLE_SOURCES[category]
+    return conn.execute(text(f"""
+        UPDATE old."{source}"
+        SET {INGESTED_AT_COLUMN} = now()
+        WHERE ({condition})
+          AND {NORMALIZE_FUNCTION}({title_column}) IN (
+              SELECT {NORMALIZE_FUNCTION}(alias) FROM unnest(CAST(:aliases AS TEXT[])) AS alias
+          )
+    """), {"aliases": list(aliases)}).rowcount
+
+
+def unresolved_titles(conn, category, where="TRUE", params=None):
+    """Return [(title, rows)] of the category's old.* rows whose title matches no alias, most frequent first.
+
+    `where` is an extra SQL condition on the source rows (see TITLE_SOURCES).
+    """
+    source, title_column, condition = TITLE_SOURCES[category]
+    rows = conn.execute(text(f"""
+        SELECT s.{title_column} AS title, COUNT(*) AS row_count
+        FROM old."{source}" s
+        WHERE ({condition}) AND ({where})
+          AND NOT EXISTS (
+              SELECT 1 FROM {ALIAS_TABLE} a
+              WHERE a.category = :category
+                AND a.alias_key = {NORMALIZE_FUNCTION}(s.{title_column})
+          )
+        GROUP BY s.{title_column}
+        ORDER BY row_count DESC, title
+    """), {**(params or {}), "category": category})
+    return [(row.title, row.row_count) for row in rows]
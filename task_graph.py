@@ -0,0 +1,120 @@
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# A unit of work: `run()` is called with no arguments once every task named in
+# `deps` has succeeded. Its return value is kept in TaskResult.value.
+Task = namedtuple("Task", ["name", "run", "deps"])
+TaskResult = namedtuple("TaskResult", ["name", "status", "value", "started", "finished", "error"])
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+
+def _validate(tasks):
+    names = [task.name for task in tasks]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate task names: {', '.join(sorted(duplicates))}")
+    known = set(names)
+    for task in tasks:
+        missing = set(task.deps) - known
+        if missing:
+            raise ValueError(f"Task '{task.name}' depends on unknown task(s): {', '.join(sorted(missing))}")
+
+    # Kahn's algorithm; anything left over is part of a cycle
+    remaining = {task.name: set(task.deps) for task in tasks}
+    while True:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            break
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    if remaining:
+        raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+
+
+def run_task_graph(tasks, max_workers=4):
+    """Run `tasks` on a thread pool, each as soon as its dependencies succeed.
+
+    A failed task does not stop independent tasks; its dependents are
+    skipped. Returns {name: TaskResult} with wall-clock start/finish times.
+    """
+    _validate(tasks)
+    by_name = {task.name: task for task in tasks}
+    results = {}
+    running = {}
+
+    def start(pool, task):
+        started = time.perf_counter()
+
+        def call():
+            try:
+                return TaskResult(task.name, STATUS_DONE, task.run(), started, time.perf_counter(), None)
+            except Exception as e:
+                return TaskResult(task.name, STATUS_FAILED, None, started, time.perf_counter(), e)
+
+        running[pool.submit(call)] = task.name
+
+    def schedule(pool):
+        for task in tasks:
+            if task.name in results or task.name in running.values():
+                continue
+            dep_status = [results[dep].status if dep in results else None for dep in task.deps]
+            if any(status in (STATUS_FAILED, STATUS_SKIPPED) for status in dep_status):
+                now = time.perf_counter()
+                results[task.name] = TaskResult(task.name, STATUS_SKIPPED, None, now, now, None)
+                return True
+            if all(status == STATUS_DONE for status in dep_status):
+                start(pool, task)
+        return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while len(results) < len(by_name):
+            # Skipping a task can unblock the skip of its own dependents
+            while schedule(pool):
+                pass
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                result = future.result()
+                results[result.name] = result
+
+    return results
+
+
+def critical_path(tasks, results):
+    """Return (names, seconds) of the longest chain of dependent task durations."""
+    deps = {task.name: task.deps for task in tasks}
+    longest = {}
+
+    def chain(name):
+        if name not in longest:
+            result = results[name]
+            own = result.finished - result.started
+            before = max((chain(dep) for dep in deps[name]), key=lambda c: c[1], default=([], 0.0))
+            longest[name] = (before[0] + [name], before[1] + own)
+        return longest[name]
+
+    return max((chain(name) for name in deps), key=lambda c: c[1], default=([], 0.0))
+
+
+def print_task_report(tasks, results, total_secs):
+    print("Task timings:")
+    origin = min((r.started for r in results.values()), default=0.0)
+    for task in tasks:
+        result = results[task.name]
+        line = (f"   - {task.name}: {result.status}, {result.finished - result.started:.2f}s "
+                f"(started at +{result.started - origin:.2f}s)")
+        if result.error is not None:
+            line += f" - {result.error}"
+        print(line)
+
+    path, path_secs = critical_path(tasks, results)
+    print(f"* Critical path: {' -> '.join(path)} ({path_secs:.2f}s)")
+    print(f"* Wall time: {total_secs:.2f}s ({total_secs - path_secs:.2f}s above the critical path)")
@@ -1,108 +1,410 @@
-import psycopg2
-import pandas as pd
-from datetime import datetime
-from dotenv import load_dotenv
+import argparse
+import glob
+import multiprocessing
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from deployment_scripts.bulk_load import stage_and_upsert
+from deployment_scripts.connection import add_env_argument, clamp_workers, get_engine, pipeline_cursor, execute_pipelined
+from deployment_scripts.csv_reader import read_sheet
+from deployment_scripts.ingest_ledger import STATUS_FAILED, ensure_ledger, file_fingerprint, loaded_hashes, record_ingest
 
 CSV_FILE = r"C:\Users\vigya\OneDrive - VigyanShaala\02 Products  Initiatives\01 SheForSTEM\05 Kalpana M&E\00 DBMS 1.0\Kalpana\Kalpana\11 Live_Session_Data\Live_session_data.csv"   # your CSV file path
 TABLE_NAME = "intermediate.live_session"  
-load_dotenv("config.env")
-
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "dbname": os.getenv("DB_NAME"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "port": int(os.getenv("DB_PORT", 5432))
+UNIQUE_COLUMNS = ["cohort_code", "code", "conducted_on"]
+UNIQUE_CONSTRAINT = "session_unique_cohort_code"
+REMOVED_DUPLICATES_CSV = "duplicate_live_session_rows.csv"
+# Side table with one content hash per session row, used to skip unchanged rows
+HASH_TABLE_NAME = "intermediate.live_session_row_hash"
+
+
+# Program name (lower-case) -> cohort code prefix; others use their first 3 letters
+PROGRAM_PREFIXES = {
+    "incubator": "INC",
+    "accelerator": "ACC",
 }
 
-# Function to convert Batch to cohort_code
-def convert_batch(batch_value: str) -> str:
-    if not batch_value:
-        return None
-    parts = batch_value.split()
-    if len(parts) != 2:
-        return None
-    program, number = parts[0], parts[1]
-    if program.lower() == "incubator":
-        code_prefix = "INC"
-    elif program.lower() == "accelerator":
-        code_prefix = "ACC"
-    else:
-        code_prefix = program[:3].upper()
+DATE_FORMAT = "%d-%b-%y"
+
+UNPARSED_ROWS_CSV = "unparsed_live_session_rows.csv"
+LOADER_NAME = "upsert_live_session_data"
+
+
+def _map_unique(values: pd.Series, convert) -> pd.Series:
+    """Apply a column transform to the distinct values only and broadcast back.
+
+    Session sheets repeat a handful of batches and dates across every row,
+    so this turns the string work from O(rows) into O(distinct values).
+    """
+    codes, uniques = pd.factorize(values)
+    converted = convert(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    result = np.full(len(values), None, dtype=object)
+    present = codes >= 0
+    result[present] = converted[codes[present]]
+    return pd.Series(result, index=values.index, dtype=object)
+
+def _batch_to_cohort_code(batch: pd.Series) -> pd.Series:
+    if batch.empty:
+        return pd.Series([], index=batch.index, dtype=object)
+    parts = batch.astype("string").str.split()
+    # Cast back to string: an all-missing token column would otherwise lose the .str accessor
+    program = parts.str[0].astype("string")
+    number = parts.str[1].astype("string")
+    prefix = program.str.lower().map(PROGRAM_PREFIXES).fillna(program.str[:3].str.upper())
     # Convert (7.0 to 007, 8.0 to 008)
-    code_number = str(number).replace(".0", "").zfill(3)
-    return f"{code_prefix}{code_number}"
+    code_number = number.str.replace(".0", "", regex=False).str.zfill(3)
+    cohort_code = (prefix + code_number).where(parts.str.len() == 2)
+    return cohort_code.astype(object).where(cohort_code.notna(), None)
 
-# Function to convert date dd-mon-yy to yyyy-mm-dd
-def convert_date(date_value: str) -> str:
-    try:
-        return datetime.strptime(date_value, "%d-%b-%y").strftime("%Y-%m-%d")
-    except Exception:
-        return None
-
-# Read CSV
-df = pd.read_csv(CSV_FILE)
-
-# Transform columns
-df["cohort_code"] = df["Batch"].apply(convert_batch)
-df["session_name"] = df["Topic"]
-df["type"] = df["Session Type"]
-df["code"] = df["Session Code"]
-df["duration_in_sec"] = 3600
-df["conducted_on"] = df["Date"].apply(convert_date)
-
-
-final_df = df[["cohort_code", "session_name", "type", "code", "duration_in_sec", "conducted_on"]]
-
-# Connect to DB
-conn = psycopg2.connect(**DB_CONFIG)
-cur = conn.cursor()
-
-cleanup_query = f"""
-DELETE FROM {TABLE_NAME} a
-USING {TABLE_NAME} b
-WHERE a.ctid < b.ctid
-  AND a.cohort_code = b.cohort_code
-  AND a.code = b.code
-  AND a.conducted_on = b.conducted_on;
-"""
+def _format_dates(dates: pd.Series) -> pd.Series:
+    parsed = pd.to_datetime(dates, format=DATE_FORMAT, errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d").astype(object).where(parsed.notna(), None)
+
+# Convert Batch ("Incubator 7.0") to cohort_code ("INC007") for a whole column
+def convert_batch(batch: pd.Series) -> pd.Series:
+    return _map_unique(batch, _batch_to_cohort_code)
+
+# Convert dates dd-mon-yy to yyyy-mm-dd for a whole column
+def convert_date(dates: pd.Series) -> pd.Series:
+    return _map_unique(dates, _format_dates)
 
-cur.execute(cleanup_query)
-# Add unique constraint 
-alter_query = f"""
-DO $$
-BEGIN
-    IF NOT EXISTS (
+def report_unparsed(df, output_csv=UNPARSED_ROWS_CSV):
+    """Print and export rows with an unconvertible Batch or Date or no Session Code; return the mask.
+
+    Every part of the (cohort_code, code, conducted_on) key must be present:
+    it is the upsert key and the row-hash table's primary key.
+    """
+    checks = {
+        "unparseable Batch": df["cohort_code"].isna(),
+        "unparseable Date": df["conducted_on"].isna(),
+        "missing Session Code": df["code"].isna(),
+    }
+    unparsed = pd.concat(checks.values(), axis=1).any(axis=1)
+    if unparsed.any():
+        rejects = df.loc[unparsed, ["Batch", "Date", "Session Code", "Topic"]].copy()
+        failed = pd.DataFrame({reason: mask[unparsed] for reason, mask in checks.items()})
+        rejects["reason"] = failed.apply(lambda row: "; ".join(row.index[row]), axis=1)
+        rejects.index = rejects.index + 2  # CSV line number (header is line 1)
+        rejects.to_csv(output_csv, index_label="line")
+        print(f"** Skipped {int(unparsed.sum())} row(s) with an unparseable Batch/Date or no Session Code "
+              f"(Batch: {int(checks['unparseable Batch'].sum())}, Date: {int(checks['unparseable Date'].sum())}, "
+              f"Session Code: {int(checks['missing Session Code'].sum())}); exported to {output_csv}")
+    return unparsed
+
+def ensure_unique_constraint(conn):
+    """Add the (cohort_code, code, conducted_on) constraint, de-duplicating once first.
+
+    When the constraint already exists the table cannot hold duplicates, so
+    the dedup scan is skipped entirely.
+    """
+    exists = conn.execute(text("""
         SELECT 1 FROM pg_constraint
-        WHERE conname = 'session_unique_cohort_code'
-        AND conrelid = '{TABLE_NAME}'::regclass
-    ) THEN
+        WHERE conname = :constraint_name
+          AND conrelid = CAST(:table_name AS regclass)
+    """), {"constraint_name": UNIQUE_CONSTRAINT, "table_name": TABLE_NAME}).first()
+    if exists:
+        return
+
+    # Single pass: number rows per key and delete all but the last physical copy
+    removed = conn.execute(text(f"""
+        DELETE FROM {TABLE_NAME} t
+        USING (
+            SELECT ctid,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY cohort_code, code, conducted_on
+                       ORDER BY ctid DESC
+                   ) AS rn
+            FROM {TABLE_NAME}
+            WHERE cohort_code IS NOT NULL
+              AND code IS NOT NULL
+              AND conducted_on IS NOT NULL
+        ) d
+        WHERE t.ctid = d.ctid
+          AND d.rn > 1
+        RETURNING t.*;
+    """)).mappings().all()
+    if removed:
+        pd.DataFrame(removed).to_csv(REMOVED_DUPLICATES_CSV, index=False)
+        print(f"* Removed {len(removed)} duplicate row(s) from {TABLE_NAME}; exported to {REMOVED_DUPLICATES_CSV}")
+
+    conn.execute(text(f"""
         ALTER TABLE {TABLE_NAME}
-        ADD CONSTRAINT session_unique_cohort_code UNIQUE (cohort_code, code, conducted_on);
-    END IF;
-END$$;
-"""
-cur.execute(alter_query)
+        ADD CONSTRAINT {UNIQUE_CONSTRAINT} UNIQUE (cohort_code, code, conducted_on);
+    """))
+    print(f"* Added unique constraint {UNIQUE_CONSTRAINT} on {TABLE_NAME}")
+
+def row_hashes(df):
+    """Stable 64-bit content hash per row (same values -> same hash across runs)."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy().view(np.int64)
+
+def ensure_hash_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {HASH_TABLE_NAME} (
+            cohort_code TEXT,
+            code TEXT,
+            conducted_on DATE,
+            row_hash BIGINT NOT NULL,
+            PRIMARY KEY (cohort_code, code, conducted_on)
+        );
+    """))
+
+def split_changed_rows(conn, final_df):
+    """Compare row hashes with the stored ones.
+
+    Returns (rows_to_load, hash_rows, new_count, changed_count, unchanged_count).
+    """
+    hashed = final_df.assign(row_hash=row_hashes(final_df))
+    stored = pd.read_sql(
+        text(f"""
+            SELECT cohort_code, code, conducted_on::TEXT AS conducted_on, row_hash
+            FROM {HASH_TABLE_NAME}
+            WHERE cohort_code = ANY(:cohort_codes)
+        """),
+        conn,
+        params={"cohort_codes": hashed["cohort_code"].unique().tolist()},
+    )
+
+    key = lambda frame: frame[UNIQUE_COLUMNS].astype(str).agg("|".join, axis=1)
+    stored_hash = pd.Series(stored["row_hash"].to_numpy(), index=key(stored)) if not stored.empty else pd.Series(dtype="int64")
+    previous = key(hashed).map(stored_hash)
+
+    is_new = previous.isna()
+    is_changed = ~is_new & (previous != hashed["row_hash"])
+    to_load = is_new | is_changed
+    return (
+        final_df[to_load],
+        hashed.loc[to_load, UNIQUE_COLUMNS + ["row_hash"]],
+        int(is_new.sum()),
+        int(is_changed.sum()),
+        int((~to_load).sum()),
+    )
 
 # UPSERT query with composite key (cohort_code, code)
-insert_query = f"""
-    INSERT INTO {TABLE_NAME} 
+INSERT_QUERY = f"""
+    INSERT INTO {TABLE_NAME} AS t
     (cohort_code, session_name, type, code, duration_in_sec, conducted_on)
     VALUES (%s, %s, %s, %s, %s, %s)
     ON CONFLICT (cohort_code, code, conducted_on) DO UPDATE SET
         session_name    = EXCLUDED.session_name,
         type            = EXCLUDED.type,
         duration_in_sec = EXCLUDED.duration_in_sec,
-        conducted_on    = EXCLUDED.conducted_on;
+        conducted_on    = EXCLUDED.conducted_on
+    WHERE (t.session_name, t.type, t.duration_in_sec)
+        IS DISTINCT FROM (EXCLUDED.session_name, EXCLUDED.type, EXCLUDED.duration_in_sec);
 """
 
-# Insert / Upsert each row
-for _, row in final_df.iterrows():
-    cur.execute(insert_query, tuple(row))
+def transform_sheet(csv_file, unparsed_csv=UNPARSED_ROWS_CSV):
+    """Read one session sheet and return (final_df, unparsed_count). No DB access."""
+    # Read CSV
+    df = read_sheet(csv_file, "live_session")
+
+    # Transform columns
+    df["cohort_code"] = convert_batch(df["Batch"])
+    df["session_name"] = df["Topic"]
+    df["type"] = df["Session Type"]
+    df["code"] = df["Session Code"]
+    df["duration_in_sec"] = 3600
+    df["conducted_on"] = convert_date(df["Date"])
+
+    unparsed = report_unparsed(df, unparsed_csv)
+    final_df = df.loc[~unparsed, ["cohort_code", "session_name", "type", "code", "duration_in_sec", "conducted_on"]]
+    # Last occurrence wins when the sheet repeats a session
+    final_df = final_df.drop_duplicates(subset=UNIQUE_COLUMNS, keep="last")
+    return final_df, int(unparsed.sum())
 
-conn.commit()
-cur.close()
-conn.close()
+def prepare_tables(conn):
+    """One-time setup shared by every file: unique constraint and hash table."""
+    ensure_unique_constraint(conn)
+    ensure_hash_table(conn)
 
-print("Data successfully upserted into database using (cohort_code, code, conducted_on).")
+def load_sessions(conn, final_df, mode="bulk", full=False):
+    """Upsert transformed rows inside the caller's transaction; return counts."""
+    # Only new or changed rows reach the table (unless --full)
+    if full:
+        hash_df = final_df.assign(row_hash=row_hashes(final_df))[UNIQUE_COLUMNS + ["row_hash"]]
+        new_count, changed_count, unchanged_count = len(final_df), 0, 0
+    else:
+        final_df, hash_df, new_count, changed_count, unchanged_count = split_changed_rows(conn, final_df)
+
+    counts = {"new": new_count, "changed": changed_count, "unchanged": unchanged_count,
+              "staged": 0, "inserted": None, "updated": None}
+    if final_df.empty:
+        return counts
+
+    if mode == "bulk":
+        # COPY into a temp staging table, then one set-based upsert
+        counts["staged"], counts["inserted"], counts["updated"] = stage_and_upsert(conn, TABLE_NAME, final_df, UNIQUE_COLUMNS)
+    else:
+        # Insert / Upsert each row (pipelined prepared statements)
+        with pipeline_cursor(conn) as cur:
+            counts["staged"] = execute_pipelined(cur, INSERT_QUERY, final_df.itertuples(index=False, name=None))
+    stage_and_upsert(conn, HASH_TABLE_NAME, hash_df, UNIQUE_COLUMNS)
+    return counts
+
+def upsert_live_sessions(csv_file=CSV_FILE, mode="bulk", full=False):
+    # Connect to DB
+    engine = get_engine("bulk_load")
+    start = time.time()
+
+    file_size, sha256 = file_fingerprint(csv_file)
+    with engine.begin() as conn:
+        ensure_ledger(conn)
+        if not full and loaded_hashes(conn, TABLE_NAME, [sha256]):
+            print(f"{csv_file} was already loaded (see meta.ingest_ledger); pass --full to reload it.")
+            return
+
+    try:
+        final_df, _ = transform_sheet(csv_file)
+        with engine.begin() as conn:
+            prepare_tables(conn)
+            counts = load_sessions(conn, final_df, mode, full)
+    except Exception as e:
+        record_ingest(engine, csv_file, file_size, sha256, TABLE_NAME, LOADER_NAME,
+                      duration=time.time() - start, status=STATUS_FAILED, error=e)
+        raise
+    record_ingest(engine, csv_file, file_size, sha256, TABLE_NAME, LOADER_NAME,
+                  row_count=len(final_df), duration=time.time() - start)
+
+    print(f"* Rows new: {counts['new']}, changed: {counts['changed']}, unchanged: {counts['unchanged']}")
+    if not counts["staged"]:
+        print("No new or changed sessions; nothing to upsert.")
+        return
+
+    print("Data successfully upserted into database using (cohort_code, code, conducted_on).")
+    print(f"   - Rows read: {counts['staged']}")
+    if counts["inserted"] is not None:
+        print(f"   - Rows inserted: {counts['inserted']}")
+        print(f"   - Rows updated: {counts['updated']}")
+    print(f"   - Elapsed: {time.time() - start:.2f} seconds")
+
+# -------------------------------
+# Multi-file ingestion
+# -------------------------------
+
+def resolve_inputs(inputs):
+    """Expand directories (all *.csv inside) and glob patterns into a sorted file list."""
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.update(str(p) for p in path.glob("*.csv"))
+        elif any(ch in item for ch in "*?["):
+            files.update(glob.glob(item))
+        else:
+            files.add(item)
+    return sorted(files)
+
+def _transform_for_pool(csv_file):
+    unparsed_csv = f"{Path(csv_file).stem}_unparsed_rows.csv"
+    start = time.time()
+    final_df, unparsed_count = transform_sheet(csv_file, unparsed_csv)
+    return final_df, unparsed_count, time.time() - start
+
+def _load_file(engine, final_df, mode, full):
+    start = time.time()
+    # Own pooled connection and transaction per file
+    with engine.begin() as conn:
+        counts = load_sessions(conn, final_df, mode, full)
+    return counts, time.time() - start
+
+def ingest_files(files, workers=4, mode="bulk", full=False):
+    """Transform files in a process pool and load each in its own transaction.
+
+    Returns one summary dict per file.
+    """
+    engine = get_engine("bulk_load")
+    # One connection per loader thread, plus one for ledger writes from this thread
+    workers = clamp_workers(workers, "bulk_load", reserved=1)
+    summary = {f: {"file": f, "rows": 0, "unparsed": 0, "new": 0, "changed": 0, "unchanged": 0,
+                   "inserted": None, "updated": None, "elapsed": 0.0, "error": None, "skipped": False}
+               for f in files}
+
+    # Files whose exact content is already in the ledger are not parsed again
+    fingerprints = {f: file_fingerprint(f) for f in files}
+    with engine.begin() as conn:
+        ensure_ledger(conn)
+        done = set() if full else loaded_hashes(conn, TABLE_NAME, {sha for _, sha in fingerprints.values()})
+    for f in files:
+        summary[f]["skipped"] = fingerprints[f][1] in done
+    pending = [f for f in files if not summary[f]["skipped"]]
+
+    def ledger(csv_file, **fields):
+        file_size, sha256 = fingerprints[csv_file]
+        record_ingest(engine, csv_file, file_size, sha256, TABLE_NAME, LOADER_NAME,
+                      duration=summary[csv_file]["elapsed"], **fields)
+
+    # Spawned workers re-import this module, which is safe (no DB work at import)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as parse_pool, \
+            ThreadPoolExecutor(max_workers=workers) as load_pool:
+        with engine.begin() as conn:
+            prepare_tables(conn)
+
+        parse_futures = {parse_pool.submit(_transform_for_pool, f): f for f in pending}
+        load_futures = {}
+        for future in as_completed(parse_futures):
+            csv_file = parse_futures[future]
+            try:
+                final_df, unparsed_count, parse_time = future.result()
+            except Exception as e:
+                summary[csv_file]["error"] = f"parse: {e}"
+                ledger(csv_file, status=STATUS_FAILED, error=summary[csv_file]["error"])
+                continue
+            summary[csv_file].update(rows=len(final_df), unparsed=unparsed_count, elapsed=parse_time)
+            load_futures[load_pool.submit(_load_file, engine, final_df, mode, full)] = csv_file
+
+        for future in as_completed(load_futures):
+            csv_file = load_futures[future]
+            try:
+                counts, load_time = future.result()
+            except Exception as e:
+                summary[csv_file]["error"] = f"load: {e}"
+                ledger(csv_file, status=STATUS_FAILED, error=summary[csv_file]["error"])
+                continue
+            summary[csv_file].update({k: counts[k] for k in ("new", "changed", "unchanged", "inserted", "updated")})
+            summary[csv_file]["elapsed"] += load_time
+            ledger(csv_file, row_count=summary[csv_file]["rows"])
+
+    return [summary[f] for f in files]
+
+def print_summary(results):
+    print(f"\n{'file':<40} {'rows':>7} {'unparsed':>8} {'new':>6} {'changed':>7} {'unchanged':>9} {'seconds':>8}  status")
+    for r in results:
+        if r["skipped"]:
+            status = "skipped (already loaded)"
+        else:
+            status = "ok" if r["error"] is None else f"FAILED ({r['error']})"
+        print(f"{Path(r['file']).name[:40]:<40} {r['rows']:>7} {r['unparsed']:>8} {r['new']:>6} "
+              f"{r['changed']:>7} {r['unchanged']:>9} {r['elapsed']:>8.2f}  {status}")
+    failed = sum(r["error"] is not None for r in results)
+    skipped = sum(r["skipped"] for r in results)
+    print(f"\n{len(results) - failed - skipped} file(s) loaded, {skipped} already loaded, {failed} failed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upsert live session sheets into intermediate.live_session")
+    parser.add_argument("inputs", nargs="*", default=[CSV_FILE],
+                        help="Live session CSV files, directories or glob patterns")
+    parser.add_argument("--mode", choices=["bulk", "rows"], default="bulk",
+                        help="bulk: COPY + single upsert (default); rows: one pipelined statement per row")
+    parser.add_argument("--full", action="store_true",
+                        help="Upsert every row, ignoring stored row hashes and the ingest ledger")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Files parsed and loaded in parallel (default: up to 4; capped by the bulk_load pool)")
+    add_env_argument(parser)
+    args = parser.parse_args()
+
+    files = resolve_inputs(args.inputs)
+    if not files:
+        print("No matching CSV files found.")
+        sys.exit(1)
+
+    if len(files) == 1:
+        upsert_live_sessions(files[0], args.mode, args.full)
+    else:
+        print_summary(ingest_files(files, args.workers, args.mode, args.full))